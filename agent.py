@@ -5,14 +5,346 @@ from pydub import AudioSegment
 from pydub.utils import make_chunks
 import time
 import re
+import subprocess
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import hashlib
+import metrics
+import script_analysis
+
+# Audio format produced by the streaming extractor (mono 16 kHz, 16-bit PCM)
+STREAM_SAMPLE_RATE = 16000
+STREAM_SAMPLE_WIDTH = 2
+STREAM_READ_SIZE = 1024 * 1024
+STREAM_BYTES_PER_MS = STREAM_SAMPLE_RATE * STREAM_SAMPLE_WIDTH // 1000
+
+# Chunking: a reel is cut near every CHUNK_WINDOW_MS of absolute time, at the
+# quietest CUT_FRAME_MS frame in the CUT_SEARCH_MS before the boundary
+# (chunks are 9-15s). Cut points depend only on the decoded audio, so the same
+# reel always gives the same chunks, streamed or downloaded.
+CHUNK_WINDOW_MS = 12000
+CUT_SEARCH_MS = 3000
+CUT_FRAME_MS = 50
+
+RAPIDAPI_URL = "https://social-media-video-downloader.p.rapidapi.com/instagram/v3/media/post/details"
+
+class GoogleSpeechBackend:
+    """
+    Speech-to-text backends take one chunk (sr.AudioData) and a language code
+    ("hi-IN"), and return its text, "" for no speech, or raise on failure
+    (retried by ReelAgent._recognize_chunk). script_retry_hints maps a language
+    code to a hint for re-running chunks that come back in the wrong script.
+    
+    This one sends each chunk to Google's free Web Speech API.
+    """
+    name = "google"
+    label = "Google Speech Recognition"
+    concurrency = None   # use ReelAgent.max_workers (keep under Google's rate limit)
+    
+    # Hint to re-run a chunk with when its text comes back in the wrong script.
+    # Google often writes Hindi speech in Urdu script; en-IN returns romanized
+    # Hindi instead, which the LLM correction step turns back into Devanagari.
+    script_retry_hints = {"hi-IN": "en-IN"}
+    
+    def cache_key(self, lang_code):
+        return lang_code
+    
+    def recognize(self, recognizer, audio_data, lang_code):
+        try:
+            return recognizer.recognize_google(audio_data, language=lang_code)
+        except sr.UnknownValueError:
+            return ""
+
+# Prompts that steer Whisper's Hindi output towards one script
+WHISPER_SCRIPT_PROMPTS = {
+    "devanagari": "नमस्ते, यह हिंदी में स्वास्थ्य के बारे में एक वीडियो है।",
+    "latin": "Namaste, yeh Hindi mein health ke baare mein ek video hai."
+}
+
+# Per-process model, loaded once by the pool initializer
+_whisper_model = None
+
+def _whisper_init(model_size, compute_type, cpu_threads):
+    global _whisper_model
+    from faster_whisper import WhisperModel
+    _whisper_model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+def _whisper_transcribe(pcm, language, initial_prompt):
+    """Runs in a pool process: 16 kHz mono int16 PCM -> text"""
+    import numpy as np
+    audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    segments, _ = _whisper_model.transcribe(
+        audio,
+        language=language,
+        initial_prompt=initial_prompt,
+        beam_size=1,
+        condition_on_previous_text=False
+    )
+    return " ".join(segment.text.strip() for segment in segments).strip()
+
+class WhisperBackend:
+    """
+    Local CPU transcription with faster-whisper (pip install faster-whisper).
+    
+    Chunks are spread over a process pool, one model per process, so throughput
+    scales with cores instead of a remote quota. output_script ("devanagari",
+    "latin" or None for the model's choice) steers the script of Hindi output.
+    """
+    name = "whisper"
+    label = "faster-whisper (local)"
+    # No script retries: an English hint makes Whisper translate instead of
+    # transliterate; output_script steers the script instead
+    script_retry_hints = {}
+    # A local CPU model is slower than Google, so the per-chunk timeout is this
+    # multiple of chunk_timeout (counted once a process has picked the chunk up)
+    TIMEOUT_SCALE = 4
+    
+    def __init__(self, model_size="small", workers=None, output_script="devanagari", compute_type="int8"):
+        if output_script and output_script not in WHISPER_SCRIPT_PROMPTS:
+            raise ValueError(f"Unknown output script: {output_script}")
+        
+        self.model_size = model_size
+        self.workers = workers or max(1, (os.cpu_count() or 2) // 2)
+        self.output_script = output_script
+        self.compute_type = compute_type
+        # Enough dispatch threads to keep every process busy while chunks queue
+        self.concurrency = self.workers * 2
+        
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        
+        # One slot per process, so a submitted chunk starts right away
+        self._slots = threading.Semaphore(self.workers)
+        self._running = {}   # (pcm digest, language, prompt) -> future still transcribing
+        self._running_lock = threading.Lock()
+    
+    def cache_key(self, lang_code):
+        return f"whisper-{self.model_size}:{lang_code}:{self.output_script}"
+    
+    def _get_pool(self):
+        """The shared process pool (created on first use)"""
+        with self._pool_lock:
+            if self._pool is None:
+                import faster_whisper  # fail fast in this process if it isn't installed
+                cpu_threads = max(1, (os.cpu_count() or 1) // self.workers)
+                # spawn: forking a threaded Streamlit server is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_whisper_init,
+                    initargs=(self.model_size, self.compute_type, cpu_threads)
+                )
+                print(f"[✓] Whisper pool started ({self.workers} processes, model {self.model_size})")
+            return self._pool
+    
+    def recognize(self, recognizer, audio_data, lang_code):
+        language = lang_code.split("-")[0]
+        prompt = WHISPER_SCRIPT_PROMPTS.get(self.output_script) if language == "hi" else None
+        pcm = audio_data.get_raw_data(convert_rate=16000, convert_width=2)
+        
+        key = (hashlib.sha1(pcm).hexdigest(), language, prompt)
+        timeout = (recognizer.operation_timeout or 15) * self.TIMEOUT_SCALE
+        
+        # A dead worker breaks the whole pool: rebuild it once instead of
+        # failing every later chunk until restart
+        for attempt in range(2):
+            pool = self._get_pool()
+            try:
+                future = self._submit(pool, key, pcm, language, prompt)
+                try:
+                    return future.result(timeout=timeout)
+                except FuturesTimeoutError:
+                    # A running worker can't be interrupted: the retry waits on this same future
+                    raise sr.RequestError(f"Whisper timed out after {timeout:.0f}s")
+            except BrokenProcessPool:
+                with self._pool_lock:
+                    if self._pool is pool:
+                        self._pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+                if attempt:
+                    raise
+                print(f"[!] Whisper worker died, restarting pool...")
+    
+    def _submit(self, pool, key, pcm, language, prompt):
+        """
+        Start transcribing a chunk once a process is free, so the caller's timeout
+        covers only the transcription. If the same chunk is still running (a timed
+        out attempt being retried), its future is returned instead of a second job.
+        """
+        with self._running_lock:
+            future = self._running.get(key)
+        if future is not None:
+            return future
+        
+        self._slots.acquire()
+        try:
+            future = pool.submit(_whisper_transcribe, pcm, language, prompt)
+        except BaseException:
+            self._slots.release()
+            raise
+        
+        with self._running_lock:
+            self._running[key] = future
+        future.add_done_callback(lambda done: self._finished(key, done))
+        return future
+    
+    def _finished(self, key, future):
+        self._slots.release()
+        with self._running_lock:
+            if self._running.get(key) is future:
+                del self._running[key]
+
+SPEECH_BACKENDS = {
+    "google": GoogleSpeechBackend,
+    "whisper": WhisperBackend
+}
+
+# Audio preparation. Module-level so it can run in ReelAgent's decode process
+# pool: ffmpeg decoding and resampling are CPU-bound and would
+# otherwise hold the GIL in the Streamlit thread handling the request.
+
+class PreparedAudio:
+    """A decoded reel: mono 16 kHz s16le PCM, its noise profile and the chunk ranges (ms)"""
+    
+    def __init__(self, pcm, noise_floor, energy_threshold, ranges):
+        self.pcm = pcm
+        self.noise_floor = noise_floor
+        self.energy_threshold = energy_threshold
+        self.ranges = ranges
+    
+    def __len__(self):
+        return len(self.pcm) // STREAM_BYTES_PER_MS
+    
+    def chunks(self):
+        """
+        Chunks with speech energy as AudioSegments (slices of the shared PCM, no
+        re-encoding). Chunks below the energy threshold are dropped before any API call.
+        """
+        chunks = (
+            _pcm_to_segment(self.pcm[start * STREAM_BYTES_PER_MS:end * STREAM_BYTES_PER_MS])
+            for start, end in self.ranges
+        )
+        return [chunk for chunk in chunks if _has_speech_energy(chunk, self.energy_threshold)]
+
+def _pcm_to_segment(pcm):
+    usable = len(pcm) - len(pcm) % STREAM_SAMPLE_WIDTH
+    return AudioSegment(
+        data=bytes(pcm[:usable]),
+        sample_width=STREAM_SAMPLE_WIDTH,
+        frame_rate=STREAM_SAMPLE_RATE,
+        channels=1
+    )
+
+def _decode_pcm(source):
+    """A file path, or (raw_data, frame_rate, channels, sample_width), as mono 16 kHz s16le PCM"""
+    if isinstance(source, str):
+        result = subprocess.run(
+            [
+                AudioSegment.converter, "-nostdin", "-loglevel", "error",
+                "-i", source,
+                "-vn", "-ac", "1", "-ar", str(STREAM_SAMPLE_RATE),
+                "-f", "s16le", "pipe:1"
+            ],
+            capture_output=True
+        )
+        if result.returncode != 0 or not result.stdout:
+            stderr = result.stderr.decode(errors="ignore").strip()
+            raise Exception(f"ffmpeg could not decode audio: {stderr[-200:]}")
+        return result.stdout
+    
+    raw_data, frame_rate, channels, sample_width = source
+    sound = AudioSegment(data=raw_data, sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+    return sound.set_channels(1).set_frame_rate(STREAM_SAMPLE_RATE).set_sample_width(STREAM_SAMPLE_WIDTH).raw_data
+
+def _noise_profile(sound, window_ms=100):
+    """
+    Noise floor in dBFS (10th percentile of window loudness ~ background noise)
+    and an energy threshold (RMS) just above it, below which a chunk is treated
+    as having no speech. (-inf, None) for silent audio.
+    """
+    windows = make_chunks(sound, window_ms)
+    levels = sorted(w.dBFS for w in windows if len(w) == window_ms)
+    
+    if not levels or levels[-1] == float("-inf"):
+        return float("-inf"), None
+    
+    noise_floor = levels[len(levels) // 10]
+    quiet = [w for w in windows if w.dBFS <= noise_floor]
+    return noise_floor, max(300, max(w.rms for w in quiet) * 1.5)
+
+def _has_speech_energy(sound, energy_threshold, window_ms=100):
+    """
+    True if any window of sound is louder than the energy threshold.
+    Without a threshold (the noise profile found only silence) any sound counts.
+    """
+    if energy_threshold is None:
+        return sound.rms > 0
+    return any(window.rms >= energy_threshold for window in make_chunks(sound, window_ms))
+
+def _find_cut(pcm, boundary_ms):
+    """
+    Cut point (ms into pcm) for a window boundary: the middle of the quietest
+    frame in the CUT_SEARCH_MS before it. Only that stretch of audio is looked
+    at, so the cut doesn't depend on how much of the reel was buffered.
+    """
+    start = boundary_ms - CUT_SEARCH_MS
+    band = _pcm_to_segment(pcm[start * STREAM_BYTES_PER_MS:boundary_ms * STREAM_BYTES_PER_MS])
+    # Ties go to the earliest frame
+    _, quietest = min((frame.rms, i) for i, frame in enumerate(make_chunks(band, CUT_FRAME_MS)))
+    return start + quietest * CUT_FRAME_MS + CUT_FRAME_MS // 2
+
+def _window_ranges(pcm):
+    """[start_ms, end_ms] chunk ranges of a whole reel; the same cuts ReelAgent._iter_stream_chunks makes"""
+    total_ms = len(pcm) // STREAM_BYTES_PER_MS
+    ranges = []
+    start = 0
+    for boundary in range(CHUNK_WINDOW_MS, total_ms + 1, CHUNK_WINDOW_MS):
+        cut = _find_cut(pcm, boundary)
+        ranges.append([start, cut])
+        start = cut
+    if start < total_ms:
+        ranges.append([start, total_ms])
+    return ranges
+
+def _prepare_audio(source):
+    """Decode, resample and chunk a reel in one go; runs in the decode pool"""
+    pcm = _decode_pcm(source)
+    noise_floor, energy_threshold = _noise_profile(_pcm_to_segment(pcm))
+    return PreparedAudio(pcm, noise_floor, energy_threshold, _window_ranges(pcm))
 
 class ReelAgent:
-    def __init__(self):
+    def __init__(self, max_workers=4, chunk_timeout=15, chunk_retries=2, stream_audio=True, transcript_cache=None,
+                 speech_backend=None, decode_workers=2):
+        """
+        Args:
+            max_workers: Max chunks recognized concurrently (keep under Google's rate limit)
+            chunk_timeout: Seconds to wait for one recognition request
+            chunk_retries: Extra attempts for a chunk after an API/network error
+            stream_audio: Pipe the download straight into ffmpeg instead of saving the MP4
+            transcript_cache: Optional store with get_chunk_transcript / save_chunk_transcripts
+                              (e.g. Database) used to skip recognition of already-seen audio
+            speech_backend: Speech-to-text backend (default: from the SPEECH_BACKEND secret, else Google)
+            decode_workers: Processes shared by all requests for decoding and segmenting audio
+        """
         self.rapidapi_key = None
+        self.rapidapi_url = RAPIDAPI_URL
+        self.transcript_cache = transcript_cache
+        self.stream_audio = stream_audio
+        self.max_workers = max_workers
+        self.chunk_timeout = chunk_timeout
+        self.chunk_retries = chunk_retries
+        self.speech_backend = speech_backend
+        self.decode_workers = decode_workers
+        self._decode_pool = None
+        self._decode_pool_lock = threading.Lock()
         self._load_config()
     
     def _load_config(self):
-        """Load RapidAPI key from Streamlit secrets"""
+        """Load RapidAPI key and speech backend settings from Streamlit secrets"""
         try:
             import streamlit as st
             self.rapidapi_key = st.secrets.get("RAPIDAPI_KEY")
@@ -20,10 +352,34 @@ class ReelAgent:
             if not self.rapidapi_key:
                 raise ValueError("RAPIDAPI_KEY not found in secrets")
             
-            print(f"[✓] RapidAPI key loaded")
+            # Optional override for recognition concurrency
+            self.max_workers = int(st.secrets.get("SPEECH_MAX_WORKERS", self.max_workers))
+            self.decode_workers = int(st.secrets.get("AUDIO_DECODE_WORKERS", self.decode_workers))
             
+            print(f"[✓] RapidAPI key loaded")
+        
         except Exception as e:
             raise ValueError(f"Failed to load RapidAPI key: {e}")
+        
+        if self.speech_backend is None:
+            self.speech_backend = self._load_speech_backend(st.secrets)
+    
+    def _load_speech_backend(self, secrets):
+        """Build the speech backend named by the SPEECH_BACKEND secret (default: google)"""
+        try:
+            backend = str(secrets.get("SPEECH_BACKEND", "google")).lower()
+            if backend not in SPEECH_BACKENDS:
+                raise ValueError(f"unknown SPEECH_BACKEND '{backend}' (choose from: {', '.join(SPEECH_BACKENDS)})")
+            if backend == "whisper":
+                return WhisperBackend(
+                    model_size=secrets.get("WHISPER_MODEL", "small"),
+                    workers=int(secrets.get("WHISPER_WORKERS", 0)) or None,
+                    output_script=secrets.get("WHISPER_SCRIPT", "devanagari") or None
+                )
+            return SPEECH_BACKENDS[backend]()
+        
+        except Exception as e:
+            raise ValueError(f"Invalid speech backend configuration: {e}")
     
     def _extract_shortcode(self, url):
         """Extract shortcode from Instagram URL"""
@@ -32,11 +388,9 @@ class ReelAgent:
             raise ValueError("Invalid Instagram URL format")
         return match.group(1)
     
-    def _download_video_rapidapi(self, shortcode):
-        """Download video using RapidAPI"""
-        print(f"[*] Downloading via RapidAPI (shortcode: {shortcode})...")
-        
-        url = "https://social-media-video-downloader.p.rapidapi.com/instagram/v3/media/post/details"
+    def _get_video_url(self, shortcode):
+        """Resolve the reel's video URL using RapidAPI"""
+        url = self.rapidapi_url
         
         querystring = {"shortcode": shortcode}
         
@@ -45,26 +399,33 @@ class ReelAgent:
             "x-rapidapi-host": "social-media-video-downloader.p.rapidapi.com"
         }
         
-        try:
+        with metrics.span("rapidapi_lookup"):
             response = requests.get(url, headers=headers, params=querystring, timeout=30)
-            
-            if response.status_code != 200:
-                raise Exception(f"RapidAPI returned status {response.status_code}")
-            
-            data = response.json()
-            
-            try:
-                video_url = data['contents'][0]['videos'][0]['url']
-            except (KeyError, IndexError, TypeError) as e:
-                raise Exception(f"Failed to extract video URL: {e}")
+        
+        if response.status_code != 200:
+            raise Exception(f"RapidAPI returned status {response.status_code}")
+        
+        data = response.json()
+        
+        try:
+            return data['contents'][0]['videos'][0]['url']
+        except (KeyError, IndexError, TypeError) as e:
+            raise Exception(f"Failed to extract video URL: {e}")
+    
+    def _download_video_rapidapi(self, shortcode, video_url=None):
+        """Download video using RapidAPI"""
+        print(f"[*] Downloading via RapidAPI (shortcode: {shortcode})...")
+        
+        try:
+            video_url = video_url or self._get_video_url(shortcode)
             
             video_temp = f"temp_reel_{shortcode}_{int(time.time())}.mp4"
             
             print(f"[*] Downloading video file...")
-            with requests.get(video_url, stream=True, timeout=60) as r:
+            with metrics.span("video_download"), requests.get(video_url, stream=True, timeout=60) as r:
                 r.raise_for_status()
                 with open(video_temp, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192):
+                    for chunk in r.iter_content(chunk_size=STREAM_READ_SIZE):
                         f.write(chunk)
             
             print(f"[✓] Video downloaded: {video_temp}")
@@ -73,18 +434,202 @@ class ReelAgent:
         except Exception as e:
             raise Exception(f"RapidAPI download failed: {e}")
     
-    def _transcribe_audio_google(self, video_path, language="hindi"):
+    def _iter_audio_stream(self, video_url):
         """
-        Transcribe audio using Google Speech Recognition API
+        Pipe the video download into ffmpeg and keep only a mono 16 kHz audio track.
+        Yields raw s16le PCM blocks as soon as ffmpeg decodes them; the video
+        stream never touches disk.
+        """
+        print(f"[*] Streaming audio via ffmpeg...")
+        started = time.perf_counter()
+        
+        command = [
+            AudioSegment.converter, "-loglevel", "error",
+            "-i", "pipe:0",
+            "-vn", "-ac", "1", "-ar", str(STREAM_SAMPLE_RATE),
+            "-f", "s16le", "pipe:1"
+        ]
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        download_error = []
+        
+        def feed_ffmpeg():
+            try:
+                with requests.get(video_url, stream=True, timeout=60) as r:
+                    r.raise_for_status()
+                    for chunk in r.iter_content(chunk_size=STREAM_READ_SIZE):
+                        process.stdin.write(chunk)
+            except Exception as e:
+                download_error.append(e)
+            finally:
+                try:
+                    process.stdin.close()
+                except OSError:
+                    pass
+        
+        writer = threading.Thread(target=feed_ffmpeg, daemon=True)
+        writer.start()
+        
+        # stderr is drained in the background so ffmpeg never blocks on it
+        stderr_lines = []
+        drain = threading.Thread(target=lambda: stderr_lines.append(process.stderr.read()), daemon=True)
+        drain.start()
+        
+        total_bytes = 0
+        finished = False
+        try:
+            while True:
+                block = process.stdout.read1(STREAM_READ_SIZE)
+                if not block:
+                    break
+                total_bytes += len(block)
+                yield block
+            finished = True
+        finally:
+            if not finished:
+                # Consumer stopped early: don't leave ffmpeg running
+                process.kill()
+            process.wait()
+            writer.join()
+            drain.join()
+        
+        if process.returncode != 0 or not total_bytes:
+            stderr = b"".join(stderr_lines).decode(errors="ignore").strip()
+            raise Exception(f"ffmpeg could not decode stream: {stderr[-200:]}")
+        if download_error:
+            raise Exception(f"Video stream failed: {download_error[0]}")
+        
+        # Download + decode overlap here, so they are timed as one stage
+        metrics.observe("stream_download_decode", time.perf_counter() - started)
+        print(f"[✓] Audio streamed: {total_bytes / (STREAM_BYTES_PER_MS * 1000):.1f}s")
+    
+    def _get_decode_pool(self):
+        with self._decode_pool_lock:
+            if self._decode_pool is None:
+                # spawn: forking a threaded Streamlit server is unsafe
+                self._decode_pool = ProcessPoolExecutor(
+                    max_workers=self.decode_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._decode_pool
+    
+    def _run_in_decode_pool(self, func, *args):
+        """
+        Run CPU-bound audio work in the shared process pool and wait for the result.
+        If a worker died (e.g. OOM on a long reel) the pool is rebuilt and the work retried once.
+        """
+        for attempt in range(2):
+            pool = self._get_decode_pool()
+            try:
+                return pool.submit(func, *args).result()
+            except BrokenProcessPool:
+                with self._decode_pool_lock:
+                    # Another request may already have replaced it
+                    if self._decode_pool is pool:
+                        self._decode_pool = None
+                pool.shutdown(wait=False, cancel_futures=True)
+                if attempt:
+                    raise
+                print(f"[!] Audio decode worker died, restarting pool...")
+    
+    def _prepare_audio(self, source):
+        """
+        Decode, resample to mono 16 kHz and chunk audio in the decode pool.
+        source: a file path, an AudioSegment or (raw_data, frame_rate, channels, sample_width).
+        Returns PreparedAudio.
+        """
+        if isinstance(source, AudioSegment):
+            source = (source.raw_data, source.frame_rate, source.channels, source.sample_width)
+        
+        with metrics.span("audio_prepare"):
+            return self._run_in_decode_pool(_prepare_audio, source)
+    
+    def _load_audio(self, shortcode, video_url, stream=True):
+        """
+        A reel's decoded audio as PreparedAudio: streamed through ffmpeg into memory
+        when stream is set, otherwise (or if the stream can't be decoded) downloaded
+        to a temp file, which is removed afterwards.
+        """
+        if stream:
+            try:
+                pcm = b"".join(self._iter_audio_stream(video_url))
+                return self._prepare_audio((pcm, STREAM_SAMPLE_RATE, 1, STREAM_SAMPLE_WIDTH))
+            except Exception as e:
+                # e.g. MP4 with the moov atom at the end can't be decoded from a pipe
+                print(f"[!] Streaming failed ({e}), falling back to file download")
+        
+        video_path = self._download_video_rapidapi(shortcode, video_url)
+        try:
+            return self._prepare_audio(video_path)
+        finally:
+            if os.path.exists(video_path):
+                os.remove(video_path)
+    
+    def fetch_audio(self, shortcode):
+        """
+        Download and decode a reel's audio (streamed when enabled, file download otherwise).
+        Returns PreparedAudio, ready for _transcribe_audio_google.
+        """
+        return self._load_audio(shortcode, self._get_video_url(shortcode), self.stream_audio)
+    
+    def _iter_stream_chunks(self, pcm_blocks):
+        """
+        Turn a stream of PCM blocks into chunks as soon as they are complete.
+        A chunk is emitted once the stream passes its window boundary, so recognition
+        can start while the rest of the reel is still downloading. Cuts are the ones
+        _window_ranges() picks for the whole reel, whatever the pipe's read sizes.
+        Chunks below the energy threshold are dropped, as in PreparedAudio.chunks().
+        """
+        pcm = bytearray()
+        offset = 0   # absolute ms of pcm[0]
+        boundary = CHUNK_WINDOW_MS
+        profile = None
+        
+        for block in pcm_blocks:
+            pcm.extend(block)
+            
+            while offset + len(pcm) // STREAM_BYTES_PER_MS >= boundary:
+                # Noise profile from the first window, reused for the rest of the reel
+                if profile is None:
+                    profile = self._measure_noise(_pcm_to_segment(pcm))
+                
+                cut = _find_cut(pcm, boundary - offset)
+                chunk = _pcm_to_segment(pcm[:cut * STREAM_BYTES_PER_MS])
+                if _has_speech_energy(chunk, profile[1]):
+                    yield chunk
+                del pcm[:cut * STREAM_BYTES_PER_MS]
+                offset += cut
+                boundary += CHUNK_WINDOW_MS
+        
+        # End of stream: flush whatever is left (whole milliseconds, like _window_ranges)
+        usable = len(pcm) // STREAM_BYTES_PER_MS * STREAM_BYTES_PER_MS
+        if usable:
+            chunk = _pcm_to_segment(pcm[:usable])
+            if profile is None:
+                profile = self._measure_noise(chunk)
+            if _has_speech_energy(chunk, profile[1]):
+                yield chunk
+    
+    def _transcribe_audio_google(self, video_path, language="hindi", use_cache=True):
+        """
+        Transcribe audio with the configured speech backend (Google by default)
         No microphone needed - works with audio files!
+        
+        video_path may also be an already decoded AudioSegment or PreparedAudio.
+        use_cache=False ignores cached chunk transcripts (Force Refresh).
         """
         print(f"\n{'='*60}")
         print(f"[*] TRANSCRIPTION START")
-        print(f"    Video: {video_path}")
+        print(f"    Video: {video_path if isinstance(video_path, str) else 'streamed audio'}")
         print(f"    Language: {language}")
+        print(f"    Backend: {self.speech_backend.label}")
         print(f"{'='*60}")
         
-        # Language codes for Google Speech API
+        # Language codes (BCP-47, as Google expects; other backends map them)
         lang_codes = {
             "hindi": "hi-IN",
             "english": "en-US"
@@ -93,62 +638,33 @@ class ReelAgent:
         lang_code = lang_codes.get(language.lower(), "hi-IN")
         
         full_transcript = []
-        chunk_files = []
         
         try:
-            # Load audio with pydub
+            # Decode, resample and chunk in the decode pool
             print(f"[*] Loading audio...")
-            sound = AudioSegment.from_file(video_path)
+            if isinstance(video_path, PreparedAudio):
+                prepared = video_path
+            else:
+                prepared = self._prepare_audio(video_path)
             
-            duration_seconds = len(sound) / 1000
+            duration_seconds = len(prepared) / 1000
             print(f"    Duration: {duration_seconds:.1f}s")
             
-            # Split into 10-second chunks
-            chunk_length_ms = 10000
-            chunks = make_chunks(sound, chunk_length_ms)
+            recognizer = sr.Recognizer()
+            recognizer.operation_timeout = self.chunk_timeout
+            
+            # Noise profile: measured once per reel, drops chunks without speech energy
+            self._log_noise_profile(prepared.noise_floor, prepared.energy_threshold)
+            chunks = prepared.chunks()
             
             print(f"    Total chunks: {len(chunks)}")
+            if not chunks:
+                print(f"    No speech energy detected")
+                return ""
             print(f"\n[*] Transcribing...\n")
             
-            # Initialize recognizer
-            recognizer = sr.Recognizer()
-            
-            # Process each chunk
-            for i, chunk in enumerate(chunks):
-                chunk_name = f"chunk_{i}_{int(time.time())}.wav"
-                chunk_files.append(chunk_name)
-                
-                # Export chunk as WAV
-                chunk.export(chunk_name, format="wav")
-                
-                try:
-                    # Load audio file
-                    with sr.AudioFile(chunk_name) as source:
-                        # Adjust for ambient noise (duration must be int)
-                        recognizer.adjust_for_ambient_noise(source, duration=1)
-                        # Record the audio
-                        audio_data = recognizer.record(source)
-                    
-                    # Recognize speech using Google Speech Recognition API
-                    text = recognizer.recognize_google(audio_data, language=lang_code)
-                    
-                    if text and text.strip():
-                        full_transcript.append(text)
-                        
-                        preview = text[:60] + "..." if len(text) > 60 else text
-                        print(f"    [{i+1}/{len(chunks)}] ✓ {len(text)} chars")
-                        print(f"         {preview}")
-                    
-                except sr.UnknownValueError:
-                    # Google Speech Recognition could not understand audio
-                    print(f"    [{i+1}/{len(chunks)}] - Silent/unclear")
-                
-                except sr.RequestError as e:
-                    # Could not request results from Google Speech Recognition
-                    print(f"    [{i+1}/{len(chunks)}] ! API Error: {e}")
-                
-                except Exception as e:
-                    print(f"    [{i+1}/{len(chunks)}] ! Error: {e}")
+            # Recognize chunks in parallel, reassembled in chunk order
+            full_transcript = list(self._recognize_in_order(chunks, recognizer, lang_code, len(chunks), use_cache))
             
             # Combine all transcripts
             final_transcript = " ".join(full_transcript)
@@ -163,15 +679,18 @@ class ReelAgent:
             
             # Script verification for Hindi
             if language == "hindi" and final_transcript:
-                devanagari_count = sum(1 for c in final_transcript if '\u0900' <= c <= '\u097F')
-                arabic_count = sum(1 for c in final_transcript if '\u0600' <= c <= '\u06FF')
+                scripts = script_analysis.analyze(final_transcript)
+                ratios = scripts.ratios
                 
                 print(f"\nScript Analysis:")
-                print(f"  Devanagari: {devanagari_count}")
-                print(f"  Arabic/Urdu: {arabic_count}")
+                print(f"  Devanagari: {scripts.devanagari} ({ratios['devanagari']:.0%})")
+                print(f"  Arabic/Urdu: {scripts.arabic} ({ratios['arabic']:.0%})")
+                print(f"  Latin: {scripts.latin} ({ratios['latin']:.0%})")
                 
-                if arabic_count > devanagari_count:
+                if scripts.dominant == "arabic":
                     print(f"  ⚠️  WARNING: Urdu script!")
+                elif scripts.mixed:
+                    print(f"  ⚠️  Mixed scripts")
                 else:
                     print(f"  ✓  Correct (Devanagari)")
             
@@ -191,24 +710,216 @@ class ReelAgent:
             
         except Exception as e:
             raise Exception(f"Transcription failed: {e}")
+    
+    def _measure_noise(self, sound, window_ms=100):
+        """
+        Measure the reel's noise floor once, from its quietest windows.
+        Returns (noise_floor, energy_threshold), see _noise_profile().
+        """
+        noise_floor, energy_threshold = _noise_profile(sound, window_ms)
+        self._log_noise_profile(noise_floor, energy_threshold)
+        return noise_floor, energy_threshold
+    
+    def _log_noise_profile(self, noise_floor, energy_threshold):
+        if energy_threshold is None:
+            return
+        print(f"    Noise floor: {noise_floor:.1f} dBFS (energy threshold {energy_threshold:.0f})")
+    
+    def _recognize_chunk(self, recognizer, audio_data, lang_code, index, total):
+        """
+        Recognize one chunk with retries.
+        Returns text, "" if the chunk has no recognizable speech, or None if every attempt failed.
+        """
+        for attempt in range(self.chunk_retries + 1):
+            try:
+                with metrics.span("speech_chunk", backend=self.speech_backend.name):
+                    text = self.speech_backend.recognize(recognizer, audio_data, lang_code)
+                
+                if text and text.strip():
+                    text = self._fix_script(recognizer, audio_data, lang_code, text, index, total)
+                    preview = text[:60] + "..." if len(text) > 60 else text
+                    print(f"    [{index+1}/{total}] ✓ {len(text)} chars")
+                    print(f"         {preview}")
+                    return text
+                
+                print(f"    [{index+1}/{total}] - Silent/unclear")
+                return ""
+                
+            except sr.RequestError as e:
+                # Could not reach the speech service (includes timeouts)
+                print(f"    [{index+1}/{total}] ! API Error (attempt {attempt+1}): {e}")
+            
+            except Exception as e:
+                print(f"    [{index+1}/{total}] ! Error (attempt {attempt+1}): {e}")
+            
+            if attempt < self.chunk_retries:
+                metrics.count("speech_retries")
+                time.sleep(0.5 * (attempt + 1))
         
-        finally:
-            # Cleanup chunk files
-            print(f"[*] Cleaning up {len(chunk_files)} chunk files...")
-            for chunk_file in chunk_files:
-                if os.path.exists(chunk_file):
-                    try:
-                        os.remove(chunk_file)
-                    except Exception as cleanup_error:
-                        print(f"    ! Could not remove {chunk_file}: {cleanup_error}")
+        return None
+    
+    def _fix_script(self, recognizer, audio_data, lang_code, text, index, total):
+        """
+        Re-run a chunk with another language hint when its text is in a script
+        the language shouldn't produce (e.g. Urdu script for Hindi).
+        Keeps the original text if the retry doesn't do better.
+        """
+        retry_hint = getattr(self.speech_backend, "script_retry_hints", {}).get(lang_code)
+        if not retry_hint or script_analysis.is_expected_script(text, lang_code):
+            return text
+        
+        print(f"    [{index+1}/{total}] ~ {script_analysis.count_scripts(text).dominant} script, retrying as {retry_hint}")
+        metrics.count("speech_script_retries")
+        
+        try:
+            with metrics.span("speech_chunk", backend=self.speech_backend.name):
+                retried = self.speech_backend.recognize(recognizer, audio_data, retry_hint)
+        except Exception as e:
+            print(f"    [{index+1}/{total}] ! Script retry failed: {e}")
+            return text
+        
+        if retried and retried.strip() and script_analysis.is_expected_script(retried, lang_code):
+            return retried
+        return text
+    
+    def _fingerprint_chunk(self, chunk, lang_code):
+        """
+        Exact fingerprint of a chunk: backend/language plus a hash of its PCM and format.
+        Chunks are cut on fixed windows of the decoded audio, so the same reel analyzed
+        again (streamed or downloaded) gives the same fingerprints; a loose match could
+        silently return another reel's text.
+        """
+        digest = hashlib.sha1()
+        digest.update(f"{self.speech_backend.cache_key(lang_code)}:{chunk.frame_rate}:{chunk.sample_width}:{len(chunk.raw_data)}:".encode("utf-8"))
+        digest.update(chunk.raw_data)
+        return digest.hexdigest()
     
-    def download_and_extract(self, url, video_lang="hindi"):
+    def _recognize_in_order(self, chunks, recognizer, lang_code, total="?", use_cache=True):
+        """
+        Recognize chunks on the thread pool as they arrive from `chunks`
+        (any iterable, including a live stream). Yields non-empty texts in chunk order.
+        
+        Chunks are pulled by a producer thread, so each text is yielded as soon as
+        it is recognized, even while the stream is still waiting for the next chunk.
+        
+        Chunks whose fingerprint is in the transcript cache are never sent for recognition.
+        With use_cache=False every chunk is recognized again and the cache is overwritten.
+        """
+        entries = queue.Queue()
+        stop = threading.Event()
+        done = object()
+        new_results = {}
+        
+        def produce():
+            hits = 0
+            iterator = iter(chunks)
+            try:
+                for i, chunk in enumerate(iterator):
+                    if stop.is_set():
+                        break
+                    # Raw mono PCM straight into AudioData; the full chunk is recognized
+                    chunk = chunk.set_channels(1)
+                    fingerprint = self._fingerprint_chunk(chunk, lang_code)
+                    cached = None
+                    if self.transcript_cache and use_cache:
+                        cached = self.transcript_cache.get_chunk_transcript(fingerprint)
+                    
+                    if cached is not None:
+                        future = Future()
+                        future.set_result(cached)
+                        hits += 1
+                    else:
+                        audio_data = sr.AudioData(chunk.raw_data, chunk.frame_rate, chunk.sample_width)
+                        future = pool.submit(self._recognize_chunk, recognizer, audio_data, lang_code, i, total)
+                    entries.put((fingerprint, cached is None, future))
+                entries.put((done, hits, None))
+            except BaseException as e:
+                entries.put((done, hits, e))
+            finally:
+                # Consumer gave up early: stop the stream (e.g. kill ffmpeg)
+                if stop.is_set() and hasattr(iterator, "close"):
+                    iterator.close()
+        
+        workers = self.speech_backend.concurrency or self.max_workers
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            producer = threading.Thread(target=produce, daemon=True, name="chunk-producer")
+            producer.start()
+            try:
+                while True:
+                    entry = entries.get()
+                    if entry[0] is done:
+                        _, cache_hits, error = entry
+                        if error is not None:
+                            raise error
+                        break
+                    text = self._collect_result(entry, new_results)
+                    if text:
+                        yield text
+            finally:
+                stop.set()
+        
+        if cache_hits:
+            metrics.count("speech_chunk_cache_hits", cache_hits)
+            print(f"    Transcript cache: {cache_hits} chunk(s) reused")
+        if self.transcript_cache and new_results:
+            self.transcript_cache.save_chunk_transcripts(new_results)
+    
+    def _collect_result(self, entry, new_results):
+        """Unpack a pending (fingerprint, is_new, future) entry, remembering fresh results."""
+        fingerprint, is_new, future = entry
+        text = future.result()
+        
+        # Failed requests (None) are not cached so they get retried next time
+        if is_new and text is not None:
+            new_results[fingerprint] = text
+        
+        return text
+    
+    def stream_transcript(self, url, video_lang="hindi", use_cache=True):
+        """
+        Download, decode and recognize a reel as one overlapping pipeline.
+        
+        Yields transcript pieces in order as soon as each chunk is recognized,
+        so the caller can show partial text while later chunks are still downloading.
+        Falls back to a full file download if the stream can't be decoded.
+        """
+        shortcode = self._extract_shortcode(url)
+        lang_code = {"hindi": "hi-IN", "english": "en-US"}.get(video_lang.lower(), "hi-IN")
+        
+        recognizer = sr.Recognizer()
+        recognizer.operation_timeout = self.chunk_timeout
+        
+        print(f"[*] Streaming pipeline (shortcode: {shortcode}, language: {lang_code})")
+        video_url = self._get_video_url(shortcode)
+        yielded = False
+        
+        try:
+            chunks = self._iter_stream_chunks(self._iter_audio_stream(video_url))
+            for text in self._recognize_in_order(chunks, recognizer, lang_code, use_cache=use_cache):
+                yielded = True
+                yield text
+            return
+        except Exception as e:
+            if yielded:
+                raise
+            # e.g. MP4 with the moov atom at the end can't be decoded from a pipe
+            print(f"[!] Streaming failed ({e}), falling back to file download")
+        
+        prepared = self._load_audio(shortcode, video_url, stream=False)
+        self._log_noise_profile(prepared.noise_floor, prepared.energy_threshold)
+        chunks = prepared.chunks()
+        yield from self._recognize_in_order(chunks, recognizer, lang_code, len(chunks), use_cache)
+    
+    def download_and_extract(self, url, video_lang="hindi", on_partial=None, use_cache=True):
         """
         Main method: Download Instagram Reel and extract transcript
         
         Args:
             url: Instagram Reel URL
             video_lang: Language spoken in video ("hindi" or "english")
+            on_partial: Optional callback, called with the transcript so far
+                        each time a chunk is recognized (streaming mode only)
+            use_cache: Reuse cached chunk transcripts (False for Force Refresh)
         
         Returns:
             tuple: (shortcode, transcript)
@@ -221,14 +932,23 @@ class ReelAgent:
             print(f"[NEW ANALYSIS REQUEST]")
             print(f"Shortcode: {shortcode}")
             print(f"Language: {video_lang}")
-            print(f"Method: RapidAPI + Google Speech Recognition")
+            print(f"Method: RapidAPI + {self.speech_backend.label}")
             print(f"{'='*60}\n")
             
-            # Step 1: Download video via RapidAPI
-            video_path = self._download_video_rapidapi(shortcode)
-            
-            # Step 2: Transcribe using Google Speech Recognition
-            transcript = self._transcribe_audio_google(video_path, video_lang)
+            if self.stream_audio:
+                # Download, decode and recognition overlap
+                pieces = []
+                for text in self.stream_transcript(url, video_lang, use_cache):
+                    pieces.append(text)
+                    if on_partial:
+                        on_partial(" ".join(pieces))
+                transcript = " ".join(pieces)
+            else:
+                # Step 1: Download video via RapidAPI
+                video_path = self._download_video_rapidapi(shortcode)
+                
+                # Step 2: Transcribe using Google Speech Recognition
+                transcript = self._transcribe_audio_google(video_path, video_lang, use_cache)
             
             # Validation
             if not transcript or len(transcript.strip()) == 0:
@@ -0,0 +1,204 @@
+"""
+Headless batch fact-checker for lists of Instagram Reel URLs.
+
+Usage:
+    python batch.py urls.txt --output results.jsonl
+
+Reads one URL per line, dedupes by shortcode, skips reels already in the
+database, and processes the rest with separate concurrency limits for the
+download, speech and LLM stages. Each finished reel is appended to the
+output JSONL and recorded in a checkpoint file, so a crashed run resumes
+where it stopped. Failed reels are not checkpointed and are retried on the
+next run. --refresh redoes every reel: it ignores the database, the LLM
+cache and the checkpoint (finished reels are still checkpointed). API keys
+are read from .streamlit/secrets.toml like the app.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from agent import ReelAgent
+from llm_checker import HealthClaimChecker
+from database import Database
+
+class BatchRunner:
+    def __init__(self, agent, checker, db, output_file, checkpoint_file=None,
+                 download_workers=4, speech_workers=2, llm_workers=3,
+                 video_lang="hindi", output_lang="hindi", refresh=False):
+        self.agent = agent
+        self.checker = checker
+        self.db = db
+        self.output_file = output_file
+        self.checkpoint_file = checkpoint_file or output_file + ".checkpoint"
+        self.video_lang = video_lang
+        self.output_lang = output_lang
+        self.refresh = refresh
+        
+        # Per-stage concurrency limits
+        self.download_slots = threading.Semaphore(download_workers)
+        self.speech_slots = threading.Semaphore(speech_workers)
+        self.llm_slots = threading.Semaphore(llm_workers)
+        self.max_workers = download_workers + speech_workers + llm_workers
+        
+        self._write_lock = threading.Lock()
+    
+    def _load_checkpoint(self):
+        if not os.path.exists(self.checkpoint_file):
+            return set()
+        with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+            return {line.strip() for line in f if line.strip()}
+    
+    def _dedupe(self, urls):
+        """Map shortcode -> first URL seen for it; invalid URLs are reported and dropped"""
+        reels = {}
+        for url in urls:
+            try:
+                shortcode = self.agent._extract_shortcode(url)
+            except ValueError:
+                print(f"[!] Skipping invalid URL: {url}")
+                continue
+            reels.setdefault(shortcode, url)
+        return reels
+    
+    def _record(self, result):
+        """
+        Append a result line (flushed to disk) and mark its shortcode done.
+        Failures are not checkpointed, so the next run retries them.
+        """
+        with self._write_lock:
+            with open(self.output_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            if result['status'] == 'error':
+                return
+            with open(self.checkpoint_file, 'a', encoding='utf-8') as f:
+                f.write(result['shortcode'] + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def _process(self, shortcode, url):
+        started = time.time()
+        
+        try:
+            with self.download_slots:
+                audio = self.agent.fetch_audio(shortcode)
+            
+            with self.speech_slots:
+                transcript = self.agent._transcribe_audio_google(audio, self.video_lang, use_cache=not self.refresh)
+            
+            if not transcript or not transcript.strip():
+                raise Exception("No speech detected in video")
+            
+            with self.llm_slots:
+                corrected, analysis = self.checker.correct_and_analyze(
+                    transcript, self.output_lang, use_cache=not self.refresh
+                )
+            
+            self.db.save_fact_check(
+                url, shortcode, transcript, analysis,
+                analysis.get('rating', 0),
+                corrected_transcript=corrected
+            )
+            
+            result = {
+                'shortcode': shortcode,
+                'reel_url': url,
+                'status': 'ok',
+                'rating': analysis.get('rating', 0),
+                'transcript': transcript,
+                'corrected_transcript': corrected,
+                'analysis': analysis,
+                'seconds': round(time.time() - started, 1)
+            }
+        
+        except Exception as e:
+            print(f"[!] {shortcode} failed: {e}")
+            result = {
+                'shortcode': shortcode,
+                'reel_url': url,
+                'status': 'error',
+                'error': str(e),
+                'seconds': round(time.time() - started, 1)
+            }
+        
+        self._record(result)
+        return result
+    
+    def run(self, urls):
+        """Process a list of URLs. Returns a {status: count} summary."""
+        reels = self._dedupe(urls)
+        # A refresh redoes reels a previous run already finished
+        done = set() if self.refresh else self._load_checkpoint()
+        summary = {'ok': 0, 'cached': 0, 'error': 0, 'resumed': 0}
+        
+        pending = []
+        for shortcode, url in reels.items():
+            if shortcode in done:
+                summary['resumed'] += 1
+                continue
+            
+            existing = None if self.refresh else self.db.get_fact_check(shortcode)
+            if existing:
+                self._record({
+                    'shortcode': shortcode,
+                    'reel_url': url,
+                    'status': 'cached',
+                    'rating': existing.get('rating', 0),
+                    'analysis': existing['analysis']
+                })
+                summary['cached'] += 1
+                continue
+            
+            pending.append((shortcode, url))
+        
+        print(f"\n{'='*60}")
+        print(f"[BATCH RUN]")
+        print(f"URLs: {len(urls)} | Unique reels: {len(reels)}")
+        print(f"Already done: {summary['resumed']} | Cached: {summary['cached']} | To process: {len(pending)}")
+        print(f"{'='*60}\n")
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for result in pool.map(lambda item: self._process(*item), pending):
+                summary[result['status']] += 1
+        
+        print(f"\n[✓] Batch complete: {summary}")
+        return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch fact-check Instagram Reels")
+    parser.add_argument("urls_file", help="Text file with one reel URL per line")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL results file (appended)")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--download-workers", type=int, default=4)
+    parser.add_argument("--speech-workers", type=int, default=2)
+    parser.add_argument("--llm-workers", type=int, default=3)
+    parser.add_argument("--video-lang", default="hindi", choices=["hindi", "english"])
+    parser.add_argument("--output-lang", default="hindi", choices=["hindi", "english"])
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached analyses, LLM responses and the checkpoint")
+    args = parser.parse_args()
+    
+    with open(args.urls_file, 'r', encoding='utf-8') as f:
+        urls = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    
+    db = Database()
+    runner = BatchRunner(
+        ReelAgent(transcript_cache=db),
+        HealthClaimChecker(),
+        db,
+        args.output,
+        checkpoint_file=args.checkpoint,
+        download_workers=args.download_workers,
+        speech_workers=args.speech_workers,
+        llm_workers=args.llm_workers,
+        video_lang=args.video_lang,
+        output_lang=args.output_lang,
+        refresh=args.refresh
+    )
+    runner.run(urls)
+
+if __name__ == "__main__":
+    main()
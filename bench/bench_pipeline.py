@@ -0,0 +1,193 @@
+"""
+Offline benchmark for the full reel pipeline (download -> speech -> LLM -> DB).
+
+Usage:
+    python bench/bench_pipeline.py --requests 20 --concurrency 1 4 8 --json bench.json
+
+Nothing leaves the machine: RapidAPI, the video CDN and Groq are served by a
+local fake server (bench/fakes.py) and Google speech recognition is replaced
+by a stub with fixed latency. Each run uses a fresh temp directory, so no
+database or LLM cache is shared between runs. Latencies of the fakes are
+flags, which makes runs comparable across machines and commits.
+
+Reports, per concurrency level: p50/p95 end-to-end latency and throughput.
+Also: peak RSS of the process and its children (ffmpeg, decode pool), and the cost of
+DB reads/writes as the fact_checks table grows.
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakeServices, FAKE_ANALYSIS, make_test_video, make_workdir, patch_recognizer
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+def peak_rss_mb():
+    """Peak RSS in MB of this process and of its (waited-for) children: ffmpeg, pool workers"""
+    self_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children_kb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(self_kb / scale, 1), round(children_kb / scale, 1)
+
+def run_pipeline(agent, checker, db, url, output_lang):
+    """One reel end-to-end, same stages as JobManager._run"""
+    started = time.perf_counter()
+    shortcode, raw_transcript = agent.download_and_extract(url, video_lang="hindi")
+    corrected, analysis = checker.correct_and_analyze(raw_transcript, output_lang, use_cache=False)
+    db.save_fact_check(url, shortcode, raw_transcript, analysis, analysis.get('rating', 0),
+                       corrected_transcript=corrected)
+    return time.perf_counter() - started
+
+def bench_concurrency(agent, checker, db, requests_per_level, levels, output_lang, run_id):
+    results = []
+    for level in levels:
+        urls = [f"https://www.instagram.com/reel/B{run_id}L{level}N{i}/" for i in range(requests_per_level)]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=level) as pool:
+            latencies = list(pool.map(lambda url: run_pipeline(agent, checker, db, url, output_lang), urls))
+        wall = time.perf_counter() - started
+
+        result = {
+            "concurrency": level,
+            "requests": len(latencies),
+            "p50_s": round(percentile(latencies, 50), 3),
+            "p95_s": round(percentile(latencies, 95), 3),
+            "mean_s": round(statistics.mean(latencies), 3),
+            "throughput_rps": round(len(latencies) / wall, 3),
+            "wall_s": round(wall, 3)
+        }
+        results.append(result)
+        print(f"[*] concurrency={level}: p50={result['p50_s']}s p95={result['p95_s']}s "
+              f"throughput={result['throughput_rps']} req/s")
+    return results
+
+def bench_db_growth(db, sizes, samples=200):
+    """
+    Write/read cost at increasing fact_checks row counts (cache cleared before reads).
+    The Database's own log lines are discarded, so terminal I/O isn't measured.
+    """
+    results = []
+    written = 0
+    for size in sizes:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            while written < size:
+                shortcode = f"DBGROW{written}"
+                db.save_fact_check(f"https://www.instagram.com/reel/{shortcode}/", shortcode,
+                                   "ट्रांसक्रिप्ट " * 50, FAKE_ANALYSIS, FAKE_ANALYSIS['rating'])
+                written += 1
+
+            write_times = []
+            for i in range(samples):
+                shortcode = f"DBPROBE{size}_{i}"
+                started = time.perf_counter()
+                db.save_fact_check(f"https://www.instagram.com/reel/{shortcode}/", shortcode,
+                                   "ट्रांसक्रिप्ट " * 50, FAKE_ANALYSIS, FAKE_ANALYSIS['rating'])
+                write_times.append(time.perf_counter() - started)
+            written += samples
+
+            db._cache.clear()
+            read_times = []
+            for i in range(samples):
+                started = time.perf_counter()
+                db.get_fact_check(f"DBGROW{(i * 7919) % size}")
+                read_times.append(time.perf_counter() - started)
+
+        result = {
+            "rows": written,
+            "write_p50_ms": round(percentile(write_times, 50) * 1000, 3),
+            "write_p95_ms": round(percentile(write_times, 95) * 1000, 3),
+            "read_p50_ms": round(percentile(read_times, 50) * 1000, 3),
+            "read_p95_ms": round(percentile(read_times, 95) * 1000, 3),
+            "db_size_kb": round(os.path.getsize(db.db_file) / 1024, 1)
+        }
+        results.append(result)
+        print(f"[*] rows={result['rows']}: write p50={result['write_p50_ms']}ms "
+              f"read p50={result['read_p50_ms']}ms size={result['db_size_kb']}KB")
+    return results
+
+def shutdown_pools(agent):
+    """Stop the agent's worker processes so getrusage(RUSAGE_CHILDREN) includes them"""
+    for pool in (agent._decode_pool, getattr(agent.speech_backend, "_pool", None)):
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the reel pipeline")
+    parser.add_argument("--requests", type=int, default=12, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--video-seconds", type=int, default=30, help="Length of the generated test reel")
+    parser.add_argument("--rapidapi-latency", type=float, default=0.2)
+    parser.add_argument("--recognizer-latency", type=float, default=0.5, help="Seconds per speech chunk")
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--db-sizes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--no-stream", action="store_true", help="Download to a file instead of streaming audio")
+    parser.add_argument("--output-lang", default="hindi", choices=["hindi", "english"])
+    parser.add_argument("--json", default=None, help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    json_path = os.path.abspath(args.json) if args.json else None
+    workdir = make_workdir()
+    os.chdir(workdir)
+    print(f"[*] Working directory: {workdir}")
+
+    video_path = os.path.join(workdir, "bench_reel.mp4")
+    make_test_video(video_path, duration_s=args.video_seconds)
+
+    services = FakeServices(
+        video_path,
+        rapidapi_latency=args.rapidapi_latency,
+        llm_latency=args.llm_latency
+    ).start()
+    os.environ["GROQ_BASE_URL"] = services.base_url
+    patch_recognizer(latency=args.recognizer_latency)
+
+    # Imported after the fakes are in place (secrets are read from the workdir)
+    from agent import ReelAgent
+    from llm_checker import HealthClaimChecker
+    from database import Database
+
+    db = Database(os.path.join(workdir, "bench.db"))
+    agent = ReelAgent(stream_audio=not args.no_stream)
+    agent.rapidapi_url = services.rapidapi_url
+    checker = HealthClaimChecker()
+
+    run_id = int(time.time())
+    try:
+        report = {
+            "config": vars(args),
+            "pipeline": bench_concurrency(agent, checker, db, args.requests, args.concurrency,
+                                          args.output_lang, run_id),
+            "db_growth": bench_db_growth(Database(os.path.join(workdir, "bench_growth.db")), args.db_sizes),
+            "fake_requests": dict(services.requests)
+        }
+        shutdown_pools(agent)
+        report["peak_rss_mb"], report["peak_rss_children_mb"] = peak_rss_mb()
+    finally:
+        services.stop()
+
+    print(f"\n[✓] Peak RSS: {report['peak_rss_mb']} MB (ffmpeg children: {report['peak_rss_children_mb']} MB)")
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"[✓] Report written to {json_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Local stand-ins for the pipeline's external services:
+
+- FakeServices: one HTTP server playing RapidAPI (media details), the
+  Instagram CDN (video file) and Groq (chat completions, incl. streaming)
+- patch_recognizer: replaces recognize_google with a stub of fixed latency
+"""
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import speech_recognition as sr
+from pydub import AudioSegment
+from pydub.generators import Sine
+
+FAKE_ANALYSIS = {
+    "corrected_transcript": "यह एक परीक्षण ट्रांसक्रिप्ट है। हल्दी से कोलेस्ट्रॉल कम होता है।",
+    "summary": "बेंचमार्क विश्लेषण",
+    "claims": [
+        {
+            "claim": "हल्दी से कोलेस्ट्रॉल कम होता है",
+            "verdict": "PARTIALLY TRUE",
+            "explanation": "सीमित प्रमाण",
+            "sources": ["PubMed PMID:12345"]
+        }
+    ],
+    "rating": 55.0,
+    "key_issues": ["अधूरा प्रमाण"]
+}
+
+def make_test_video(path, duration_s=30, speech_ms=2500, pause_ms=600):
+    """Write a faststart MP4 whose audio alternates tone ("speech") and silence"""
+    audio = AudioSegment.silent(duration=0, frame_rate=44100)
+    while len(audio) < duration_s * 1000:
+        audio += Sine(220).to_audio_segment(duration=speech_ms, volume=-12)
+        audio += AudioSegment.silent(duration=pause_ms, frame_rate=44100)
+
+    wav_path = path + ".wav"
+    audio[:duration_s * 1000].export(wav_path, format="wav")
+    try:
+        subprocess.run(
+            [
+                AudioSegment.converter, "-y", "-loglevel", "error",
+                "-f", "lavfi", "-i", f"color=c=black:s=320x240:d={duration_s}",
+                "-i", wav_path,
+                "-c:v", "mpeg4", "-c:a", "aac", "-shortest",
+                "-movflags", "+faststart", path
+            ],
+            check=True
+        )
+    finally:
+        os.remove(wav_path)
+
+class FakeServices:
+    """
+    Threaded local HTTP server. Latencies (seconds) are configurable per endpoint.
+
+    Point the pipeline at it with:
+        agent.rapidapi_url = services.rapidapi_url
+        os.environ["GROQ_BASE_URL"] = services.base_url   (before building HealthClaimChecker)
+    """
+
+    def __init__(self, video_path, rapidapi_latency=0.2, llm_latency=1.0, stream_token_delay=0.01):
+        self.video_bytes = open(video_path, 'rb').read()
+        self.rapidapi_latency = rapidapi_latency
+        self.llm_latency = llm_latency
+        self.stream_token_delay = stream_token_delay
+        self.requests = {"rapidapi": 0, "video": 0, "llm": 0}
+        self._lock = threading.Lock()
+
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body, content_type="application/json", headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+
+                if parsed.path.endswith("/media/post/details"):
+                    services._count("rapidapi")
+                    time.sleep(services.rapidapi_latency)
+                    shortcode = parse_qs(parsed.query).get("shortcode", ["x"])[0]
+                    body = {"contents": [{"videos": [{"url": f"{services.base_url}/video/{shortcode}.mp4"}]}]}
+                    self._send(200, json.dumps(body).encode("utf-8"))
+
+                elif parsed.path.startswith("/video/"):
+                    services._count("video")
+                    self._send(200, services.video_bytes, content_type="video/mp4")
+
+                else:
+                    self._send(404, b"{}")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+
+                if not self.path.endswith("/chat/completions"):
+                    self._send(404, b"{}")
+                    return
+
+                services._count("llm")
+                time.sleep(services.llm_latency)
+                content = json.dumps(FAKE_ANALYSIS, ensure_ascii=False)
+                headers = {
+                    "x-ratelimit-remaining-requests": "1000",
+                    "x-ratelimit-remaining-tokens": "100000"
+                }
+
+                if request.get("stream"):
+                    self._stream(content, headers)
+                    return
+
+                body = {
+                    "id": "bench",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": request.get("model", "bench"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {"prompt_tokens": 500, "completion_tokens": 200, "total_tokens": 700}
+                }
+                self._send(200, json.dumps(body, ensure_ascii=False).encode("utf-8"), headers=headers)
+
+            def _stream(self, content, headers):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+
+                for word in content.split(" "):
+                    chunk = {
+                        "id": "bench",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": "bench",
+                        "choices": [{"index": 0, "delta": {"content": word + " "}, "finish_reason": None}]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    time.sleep(services.stream_token_delay)
+
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.rapidapi_url = f"{self.base_url}/instagram/v3/media/post/details"
+
+    def _count(self, name):
+        with self._lock:
+            self.requests[name] += 1
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+def patch_recognizer(latency=0.5, text="यह एक परीक्षण वाक्य है"):
+    """Replace Google recognition with a stub that sleeps `latency` seconds per chunk"""
+    def fake_recognize_google(self, audio_data, key=None, language="en-US", **kwargs):
+        time.sleep(latency)
+        return text
+
+    sr.Recognizer.recognize_google = fake_recognize_google
+
+def make_workdir():
+    """Temp working dir with fake secrets, so ReelAgent/HealthClaimChecker load normally"""
+    workdir = tempfile.mkdtemp(prefix="insta_check_bench_")
+    os.makedirs(os.path.join(workdir, ".streamlit"))
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), 'w') as f:
+        f.write('RAPIDAPI_KEY = "bench"\n')
+        f.write('GROQ_API_KEY_1 = "bench-1"\n')
+        f.write('GROQ_API_KEY_2 = "bench-2"\n')
+    return workdir
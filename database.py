@@ -1,61 +1,307 @@
 import json
 import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime
+import metrics
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fact_checks (
+    shortcode TEXT PRIMARY KEY,
+    reel_url TEXT,
+    transcript TEXT,
+    corrected_transcript TEXT,
+    analysis TEXT,
+    rating REAL,
+    created_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS chats (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fact_check_id TEXT NOT NULL,
+    user_message TEXT,
+    assistant_response TEXT,
+    created_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_chats_fact_check_id ON chats (fact_check_id, id);
+
+CREATE TABLE IF NOT EXISTS transcript_chunks (
+    fingerprint TEXT PRIMARY KEY,
+    text TEXT,
+    created_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_transcript_chunks_created ON transcript_chunks (created_at);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    shortcode TEXT NOT NULL,
+    reel_url TEXT,
+    video_lang TEXT,
+    output_lang TEXT,
+    refresh INTEGER DEFAULT 0,
+    status TEXT,
+    stage TEXT,
+    progress INTEGER DEFAULT 0,
+    error TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_shortcode_status ON jobs (shortcode, status);
+
+CREATE TABLE IF NOT EXISTS migrations (
+    name TEXT PRIMARY KEY,
+    applied_at TEXT
+);
+"""
+
+class LRUCache:
+    """Small thread-safe LRU cache with per-entry TTL and hit/miss counters"""
+    
+    MISSING = object()
+    
+    def __init__(self, maxsize=256, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                self._data.pop(key, None)
+                self.misses += 1
+                return self.MISSING
+            
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+    
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def update(self, key, func):
+        """Replace a cached value with func(value), keeping its age; MISSING drops it. No-op if not cached."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return
+            value = func(entry[0])
+            if value is self.MISSING:
+                del self._data[key]
+            else:
+                self._data[key] = (value, entry[1])
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
 
 class Database:
-    def __init__(self):
+    def __init__(self, db_file="insta_check.db", cache_size=256, cache_ttl=300, max_chunk_transcripts=50000):
+        self.db_file = db_file
+        self.max_chunk_transcripts = max_chunk_transcripts
+        
+        # Read-through cache for fact checks and conversations
+        self._cache = LRUCache(maxsize=cache_size, ttl=cache_ttl)
+        self._file_signature = None
+        self._signature_lock = threading.Lock()
+        
+        # Legacy JSON files, imported once into SQLite
         self.data_file = "fact_checks.json"
         self.chat_file = "chat_history.json"
-        self._init_files()
+        self.chunk_cache_file = "transcript_chunks.json"
+        
+        # One connection per thread (Streamlit serves sessions on separate threads)
+        self._local = threading.local()
+        
+        self._init_db()
+        self._migrate_json()
+    
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    def _read_signature(self):
+        signature = []
+        for path in (self.db_file, self.db_file + "-wal"):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return signature
+    
+    def _check_external_writes(self):
+        """Drop the read cache if the database files changed (e.g. another process wrote)"""
+        signature = self._read_signature()
+        with self._signature_lock:
+            if signature != self._file_signature:
+                self._cache.clear()
+                self._file_signature = signature
     
-    def _init_files(self):
-        if not os.path.exists(self.data_file):
-            with open(self.data_file, 'w') as f:
-                json.dump({}, f)
+    @contextmanager
+    def _write(self):
+        """
+        Write transaction on this thread's connection. Our own commits move the
+        file signature forward, so they don't look like another process's writes
+        and clear the whole read cache (callers invalidate what they changed).
+        """
+        conn = self._conn()
+        with conn:
+            # Holds the write lock: nobody else can commit until we do
+            conn.execute("BEGIN IMMEDIATE")
+            before = self._read_signature()
+            yield conn
+        after = self._read_signature()
         
-        if not os.path.exists(self.chat_file):
-            with open(self.chat_file, 'w') as f:
-                json.dump({}, f)
+        with self._signature_lock:
+            # Only if nothing external was pending, else the next read still clears
+            if self._file_signature == before:
+                self._file_signature = after
     
-    def _load_fact_checks(self):
-        with open(self.data_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    def cache_stats(self):
+        """Hit/miss counters of the read cache"""
+        return self._cache.stats()
     
-    def _save_fact_checks(self, data):
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def _init_db(self):
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
     
-    def _load_chats(self):
-        with open(self.chat_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    def _migrate_json(self):
+        """One-shot import of fact_checks.json / chat_history.json / transcript_chunks.json"""
+        conn = self._conn()
+        
+        if conn.execute("SELECT 1 FROM migrations WHERE name = 'json_import'").fetchone():
+            return
+        
+        fact_checks = self._load_json(self.data_file)
+        chats = self._load_json(self.chat_file)
+        chunks = self._load_json(self.chunk_cache_file)
+        
+        with conn:
+            # Take the write lock first and re-check: the app and batch.py may
+            # both start for the first time at once
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM migrations WHERE name = 'json_import'").fetchone():
+                return
+            
+            for shortcode, fc in fact_checks.items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO fact_checks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        shortcode,
+                        fc.get('reel_url'),
+                        fc.get('transcript', ''),
+                        fc.get('corrected_transcript') or fc.get('transcript', ''),
+                        json.dumps(fc.get('analysis', {}), ensure_ascii=False),
+                        fc.get('rating', 0),
+                        fc.get('created_at')
+                    )
+                )
+            
+            for fact_check_id, turns in chats.items():
+                conn.executemany(
+                    "INSERT INTO chats (fact_check_id, user_message, assistant_response, created_at) VALUES (?, ?, ?, ?)",
+                    [
+                        (fact_check_id, t.get('user_message'), t.get('assistant_response'), t.get('created_at'))
+                        for t in turns
+                    ]
+                )
+            
+            conn.executemany(
+                "INSERT OR IGNORE INTO transcript_chunks VALUES (?, ?, ?)",
+                [(fp, entry.get('text', ''), entry.get('created_at')) for fp, entry in chunks.items()]
+            )
+            
+            conn.execute(
+                "INSERT INTO migrations VALUES ('json_import', ?)",
+                (datetime.now().isoformat(),)
+            )
+        
+        if fact_checks or chats or chunks:
+            print(f"[✓] Migrated JSON data to SQLite:")
+            print(f"    Fact checks: {len(fact_checks)}")
+            print(f"    Conversations: {len(chats)}")
+            print(f"    Chunk transcripts: {len(chunks)}\n")
+    
+    def _load_json(self, path):
+        if not os.path.exists(path):
+            return {}
+        
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"[!] Could not read {path} for migration: {e}")
+            return {}
     
-    def _save_chats(self, data):
-        with open(self.chat_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+    def _row_to_fact_check(self, row):
+        return {
+            'id': row['shortcode'],
+            'reel_url': row['reel_url'],
+            'shortcode': row['shortcode'],
+            'transcript': row['transcript'],
+            'corrected_transcript': row['corrected_transcript'],
+            'analysis': json.loads(row['analysis']),
+            'rating': row['rating'],
+            'created_at': row['created_at']
+        }
     
-    def save_fact_check(self, reel_url, shortcode, transcript, analysis, rating):
+    @metrics.timed("db_save_fact_check")
+    def save_fact_check(self, reel_url, shortcode, transcript, analysis, rating, corrected_transcript=None):
         """Save or UPDATE fact check"""
-        data = self._load_fact_checks()
+        conn = self._conn()
         
         # Check if exists
-        if shortcode in data:
+        old = conn.execute("SELECT transcript FROM fact_checks WHERE shortcode = ?", (shortcode,)).fetchone()
+        if old:
             print(f"\n[!] WARNING: Shortcode {shortcode} already exists in database!")
-            print(f"    Old transcript preview: {data[shortcode]['transcript'][:100]}...")
+            print(f"    Old transcript preview: {old['transcript'][:100]}...")
             print(f"    New transcript preview: {transcript[:100]}...")
             print(f"[*] OVERWRITING with new data...\n")
         
-        fact_check = {
-            'id': shortcode,
-            'reel_url': reel_url,
-            'shortcode': shortcode,
-            'transcript': transcript,  # This should be the NEW Devanagari transcript
-            'analysis': analysis if isinstance(analysis, dict) else json.loads(analysis),
-            'rating': rating,
-            'created_at': datetime.now().isoformat()
-        }
+        analysis = analysis if isinstance(analysis, dict) else json.loads(analysis)
         
-        data[shortcode] = fact_check
-        self._save_fact_checks(data)
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO fact_checks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    shortcode,
+                    reel_url,
+                    transcript,  # This should be the NEW Devanagari transcript
+                    corrected_transcript or transcript,
+                    json.dumps(analysis, ensure_ascii=False),
+                    rating,
+                    datetime.now().isoformat()
+                )
+            )
+        self._cache.invalidate(('fact_check', shortcode))
         
         print(f"[✓] Saved to database:")
         print(f"    Shortcode: {shortcode}")
@@ -64,10 +310,16 @@ class Database:
         
         return shortcode
     
+    @metrics.timed("db_get_fact_check")
     def get_fact_check(self, shortcode):
         """Get existing fact check"""
-        data = self._load_fact_checks()
-        result = data.get(shortcode)
+        self._check_external_writes()
+        result = self._cache.get(('fact_check', shortcode))
+        
+        if result is LRUCache.MISSING:
+            row = self._conn().execute("SELECT * FROM fact_checks WHERE shortcode = ?", (shortcode,)).fetchone()
+            result = self._row_to_fact_check(row) if row else None
+            self._cache.put(('fact_check', shortcode), result)
         
         if result:
             print(f"\n[*] Found in database: {shortcode}")
@@ -75,32 +327,111 @@ class Database:
         
         return result
     
+    @metrics.timed("db_save_chat")
     def save_chat(self, fact_check_id, user_msg, assistant_msg):
-        chats = self._load_chats()
-        
-        if fact_check_id not in chats:
-            chats[fact_check_id] = []
-        
-        chats[fact_check_id].append({
+        turn = {
             'user_message': user_msg,
             'assistant_response': assistant_msg,
             'created_at': datetime.now().isoformat()
-        })
+        }
+        with self._write() as conn:
+            turn['id'] = conn.execute(
+                "INSERT INTO chats (fact_check_id, user_message, assistant_response, created_at) VALUES (?, ?, ?, ?)",
+                (fact_check_id, user_msg, assistant_msg, turn['created_at'])
+            ).lastrowid
         
-        self._save_chats(chats)
+        # Append to a cached conversation instead of re-reading it; drop it if
+        # another thread's turn landed in between
+        self._cache.update(
+            ('chat', fact_check_id),
+            lambda turns: turns + [turn] if not turns or turns[-1]['id'] < turn['id'] else LRUCache.MISSING
+        )
     
-    def get_chat_history(self, fact_check_id):
-        chats = self._load_chats()
-        return chats.get(fact_check_id, [])
+    @metrics.timed("db_get_chat_history")
+    def get_chat_history(self, fact_check_id, since_id=0):
+        """
+        Get a conversation in order. Each turn carries its log offset 'id';
+        pass the last seen id as since_id to read only turns appended after it.
+        """
+        self._check_external_writes()
+        turns = self._cache.get(('chat', fact_check_id))
+        
+        if turns is not LRUCache.MISSING:
+            return [turn for turn in turns if turn['id'] > since_id]
+        
+        rows = self._conn().execute(
+            "SELECT id, user_message, assistant_response, created_at FROM chats "
+            "WHERE fact_check_id = ? AND id > ? ORDER BY id",
+            (fact_check_id, since_id)
+        ).fetchall()
+        turns = [dict(row) for row in rows]
+        
+        # Only a whole conversation is cached
+        if not since_id:
+            self._cache.put(('chat', fact_check_id), turns)
+        return turns
     
+    @metrics.timed("db_clear_cache")
     def clear_cache(self, shortcode):
         """Clear cached data for a shortcode"""
-        data = self._load_fact_checks()
+        with self._write() as conn:
+            deleted = conn.execute("DELETE FROM fact_checks WHERE shortcode = ?", (shortcode,)).rowcount
+        self._cache.invalidate(('fact_check', shortcode))
         
-        if shortcode in data:
-            del data[shortcode]
-            self._save_fact_checks(data)
+        if deleted:
             print(f"[✓] Cleared cache for: {shortcode}")
             return True
         
-        return False
\ No newline at end of file
+        return False
+    
+    @metrics.timed("db_get_chunk_transcript")
+    def get_chunk_transcript(self, fingerprint):
+        """Get cached transcript for an audio chunk fingerprint ("" = no speech, None = unknown)"""
+        row = self._conn().execute(
+            "SELECT text FROM transcript_chunks WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        return row['text'] if row else None
+    
+    @metrics.timed("db_save_chunk_transcripts")
+    def save_chunk_transcripts(self, results):
+        """Save {fingerprint: text} results from one transcription run"""
+        now = datetime.now().isoformat()
+        
+        with self._write() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO transcript_chunks VALUES (?, ?, ?)",
+                [(fingerprint, text, now) for fingerprint, text in results.items()]
+            )
+            # Keep the table bounded: oldest chunk transcripts go first
+            conn.execute(
+                "DELETE FROM transcript_chunks WHERE fingerprint IN ("
+                "SELECT fingerprint FROM transcript_chunks ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_chunk_transcripts,)
+            )
+        
+        print(f"[✓] Cached {len(results)} chunk transcript(s)")
+    
+    def save_job(self, job):
+        """Insert or update a background job row (see jobs.JobManager)"""
+        job = dict(job, updated_at=datetime.now().isoformat())
+        job.setdefault('created_at', job['updated_at'])
+        
+        with self._write() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, shortcode, reel_url, video_lang, output_lang, refresh, "
+                "status, stage, progress, error, created_at, updated_at) "
+                "VALUES (:id, :shortcode, :reel_url, :video_lang, :output_lang, :refresh, "
+                ":status, :stage, :progress, :error, :created_at, :updated_at)",
+                job
+            )
+    
+    def get_job(self, job_id):
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+    
+    def get_active_jobs(self):
+        """Jobs that are queued or were running (e.g. when the process stopped)"""
+        rows = self._conn().execute(
+            "SELECT * FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+        ).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,146 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+class JobManager:
+    """
+    Background analysis jobs shared by all Streamlit sessions.
+    
+    The UI submits a reel and then polls get(); the pipeline runs on a worker
+    pool, so reruns and other clicks don't interrupt it. Jobs are persisted in
+    the Database's jobs table: duplicate submissions (same reel, languages and
+    refresh flag) join the active job, and jobs left queued/running by a restart
+    are resumed.
+    """
+    
+    def __init__(self, agent, checker, db, workers=2):
+        self.agent = agent
+        self.checker = checker
+        self.db = db
+        
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}      # job_id -> live state (includes partial transcript)
+        self._active = {}    # _active_key(job) -> job_id
+        
+        self._resume()
+    
+    def _resume(self):
+        for job in self.db.get_active_jobs():
+            print(f"[*] Resuming job {job['id']} ({job['shortcode']})")
+            job.update(status='queued', stage='queued', progress=0, partial_transcript="")
+            with self._lock:
+                self._register(job)
+            self._start(job)
+    
+    # Finished jobs kept in memory for polling; older ones are read from the database
+    MAX_FINISHED_IN_MEMORY = 100
+    
+    def _active_key(self, job):
+        """
+        Jobs that may share one run: a Force Refresh must not join a cached run,
+        nor a request join a run in another language
+        """
+        return (job['shortcode'], job['video_lang'], job['output_lang'], bool(job['refresh']))
+    
+    def _register(self, job):
+        """Track a new job as the active one for its key (caller holds self._lock)"""
+        finished = [job_id for job_id, j in self._jobs.items() if j['status'] in ('done', 'error')]
+        for job_id in finished[:max(0, len(finished) - self.MAX_FINISHED_IN_MEMORY)]:
+            del self._jobs[job_id]
+        self._jobs[job['id']] = job
+        self._active[self._active_key(job)] = job['id']
+    
+    def _start(self, job):
+        self._persist(job)
+        self._pool.submit(self._run, job['id'])
+    
+    def _persist(self, job):
+        self.db.save_job({key: value for key, value in job.items() if key != 'partial_transcript'})
+    
+    def _update(self, job_id, persist=True, **changes):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(changes)
+            snapshot = dict(job)
+        if persist:
+            self._persist(snapshot)
+    
+    def submit(self, reel_url, video_lang="hindi", output_lang="hindi", refresh=False):
+        """Queue an analysis. Returns the job id (an existing one if the reel is already in progress)."""
+        shortcode = self.agent._extract_shortcode(reel_url)
+        
+        job = {
+            'id': uuid.uuid4().hex,
+            'shortcode': shortcode,
+            'reel_url': reel_url,
+            'video_lang': video_lang,
+            'output_lang': output_lang,
+            'refresh': int(refresh),
+            'status': 'queued',
+            'stage': 'queued',
+            'progress': 0,
+            'error': None,
+            'partial_transcript': ""
+        }
+        
+        # Check and register under one lock so concurrent submits coalesce
+        with self._lock:
+            existing = self._active.get(self._active_key(job))
+            if existing:
+                print(f"[*] Joining active job {existing} for {shortcode}")
+                return existing
+            self._register(job)
+        
+        self._start(job)
+        return job['id']
+    
+    def get(self, job_id):
+        """Current job state (status, stage, progress, partial_transcript, error) or None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job)
+        return self.db.get_job(job_id)
+    
+    def _run(self, job_id):
+        job = self.get(job_id)
+        
+        try:
+            self._update(job_id, status='running', stage='download', progress=15)
+            
+            def on_partial(text):
+                self._update(job_id, persist=False, stage='transcribe', progress=35, partial_transcript=text)
+            
+            shortcode, raw_transcript = self.agent.download_and_extract(
+                job['reel_url'],
+                video_lang=job['video_lang'],
+                on_partial=on_partial,
+                use_cache=not job['refresh']
+            )
+            self._update(job_id, stage='analyze', progress=50, partial_transcript=raw_transcript)
+            
+            corrected_transcript, analysis = self.checker.correct_and_analyze(
+                raw_transcript,
+                job['output_lang'],
+                use_cache=not job['refresh']
+            )
+            self._update(job_id, stage='save', progress=90)
+            
+            self.db.save_fact_check(
+                job['reel_url'], shortcode, raw_transcript,
+                analysis,
+                analysis.get('rating', 0),
+                corrected_transcript=corrected_transcript
+            )
+            self._update(job_id, status='done', stage='done', progress=100)
+        
+        except Exception as e:
+            print(f"[!] Job {job_id} failed: {e}")
+            self._update(job_id, status='error', stage='error', error=str(e))
+        
+        finally:
+            key = self._active_key(job)
+            with self._lock:
+                if self._active.get(key) == job_id:
+                    del self._active[key]
@@ -1,8 +1,187 @@
 import os
-from groq import Groq
+from groq import Groq, APIConnectionError, APITimeoutError, InternalServerError
 import json
+import hashlib
+import sqlite3
+from datetime import datetime
 import streamlit as st
 import time
+import metrics
+import random
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+class KeyScheduler:
+    """
+    Thread-safe scheduler for a pool of API keys.
+    
+    Tracks the rate-limit headers Groq returns for each key and routes every
+    call to the key with the most headroom. Rate-limited keys are parked for
+    retry-after seconds, or a jittered exponential backoff when not given.
+    """
+    
+    # Header observations older than this are treated as unknown (limits reset)
+    STALE_AFTER = 60
+    BACKOFF_BASE = 1.0
+    BACKOFF_CAP = 30.0
+    # Longest a caller may be made to wait for a parked key (e.g. not for a
+    # daily limit's retry-after: 3600); beyond it acquire() gives up
+    MAX_WAIT = 5.0
+    
+    def __init__(self, key_count):
+        self._lock = threading.Lock()
+        self._keys = [
+            {
+                "remaining_requests": None,
+                "remaining_tokens": None,
+                "observed_at": 0.0,
+                "blocked_until": 0.0,
+                "failures": 0,
+                "in_flight": 0
+            }
+            for _ in range(key_count)
+        ]
+    
+    def _headroom(self, state, now):
+        """Sort key: more remaining requests/tokens (minus calls in flight) is better"""
+        unknown = 10 ** 9
+        if now - state["observed_at"] > self.STALE_AFTER:
+            requests_left, tokens_left = unknown, unknown
+        else:
+            requests_left = state["remaining_requests"] if state["remaining_requests"] is not None else unknown
+            tokens_left = state["remaining_tokens"] if state["remaining_tokens"] is not None else unknown
+        return (requests_left - state["in_flight"], tokens_left, -state["in_flight"])
+    
+    def acquire(self):
+        """
+        Pick a key for the next call.
+        
+        Returns:
+            tuple: (key_index, seconds to wait before using it)
+        
+        Raises if every key is parked for longer than MAX_WAIT.
+        """
+        with self._lock:
+            now = time.monotonic()
+            ready = [i for i, state in enumerate(self._keys) if state["blocked_until"] <= now]
+            
+            if ready:
+                index = max(ready, key=lambda i: self._headroom(self._keys[i], now))
+                wait = 0.0
+            else:
+                index = min(range(len(self._keys)), key=lambda i: self._keys[i]["blocked_until"])
+                wait = self._keys[index]["blocked_until"] - now
+                if wait > self.MAX_WAIT:
+                    raise Exception(f"All API keys exhausted (rate limited for another {wait:.0f}s)")
+            
+            self._keys[index]["in_flight"] += 1
+            return index, wait
+    
+    def release(self, index, headers=None, rate_limited=False):
+        """Record the outcome of a call made with acquire()'s key"""
+        with self._lock:
+            state = self._keys[index]
+            state["in_flight"] = max(0, state["in_flight"] - 1)
+            now = time.monotonic()
+            
+            if headers is not None:
+                requests_left = self._int_header(headers, "x-ratelimit-remaining-requests")
+                tokens_left = self._int_header(headers, "x-ratelimit-remaining-tokens")
+                if requests_left is not None or tokens_left is not None:
+                    state["remaining_requests"] = requests_left
+                    state["remaining_tokens"] = tokens_left
+                    state["observed_at"] = now
+            
+            if rate_limited:
+                state["failures"] += 1
+                retry_after = self._float_header(headers, "retry-after")
+                if retry_after is None:
+                    # Full jitter so concurrent sessions don't retry in lockstep
+                    backoff = min(self.BACKOFF_CAP, self.BACKOFF_BASE * 2 ** (state["failures"] - 1))
+                    retry_after = random.uniform(backoff / 2, backoff)
+                state["blocked_until"] = now + retry_after
+                state["remaining_requests"] = 0
+                state["observed_at"] = now
+                return retry_after
+            
+            state["failures"] = 0
+            return 0.0
+    
+    def _float_header(self, headers, name):
+        if headers is None:
+            return None
+        try:
+            value = headers.get(name)
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+    
+    def _int_header(self, headers, name):
+        value = self._float_header(headers, name)
+        return int(value) if value is not None else None
+
+class ResponseCache:
+    """
+    Persistent LLM response cache keyed on model, normalized messages and parameters.
+    Stored in SQLite; least recently used entries are evicted beyond max_entries.
+    """
+    
+    def __init__(self, db_file="llm_cache.db", max_entries=2000):
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self._local = threading.local()
+        
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, created_at TEXT, last_used REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used ON llm_responses (last_used)")
+    
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+    
+    def make_key(self, model, messages, **params):
+        """Hash of model + messages (whitespace-normalized) + call parameters"""
+        normalized = [
+            {"role": m["role"], "content": " ".join(m["content"].split())}
+            for m in messages
+        ]
+        payload = json.dumps(
+            {"model": model, "messages": normalized, "params": params},
+            ensure_ascii=False, sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key):
+        with self._conn() as conn:
+            row = conn.execute("SELECT response FROM llm_responses WHERE key = ?", (key,)).fetchone()
+            if row:
+                conn.execute("UPDATE llm_responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        return row[0] if row else None
+    
+    def put(self, key, model, response):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, datetime.now().isoformat(), time.time())
+            )
+            conn.execute(
+                "DELETE FROM llm_responses WHERE key IN ("
+                "SELECT key FROM llm_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+    
+    def discard(self, key):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
 
 class HealthClaimChecker:
     def __init__(self):
@@ -18,51 +197,150 @@ class HealthClaimChecker:
         if not self.api_keys:
             raise ValueError("No GROQ_API_KEY found in secrets")
         
-        self.current_key_index = 0
+        # One long-lived client per key: each keeps its own HTTP connection
+        # pool (keep-alive), so calls skip TLS setup. Clients are thread-safe
+        # and shared by all sessions using the cached checker.
+        # Retries (429 key fallback, transient 5xx/connection errors) are handled
+        # by _call_with_fallback / _stream_with_fallback, not the SDK.
+        # Remove proxies parameter - newer Groq versions don't support it
+        self.clients = [Groq(api_key=key, max_retries=0) for key in self.api_keys]
+        self.key_scheduler = KeyScheduler(len(self.api_keys))
+        
         self.model = "llama-3.3-70b-versatile"
+        self.response_cache = ResponseCache()
+        
+        # Prepared chat context per fact_check_id (system prompt + running summary)
+        self._chat_contexts = OrderedDict()
+        self._chat_contexts_lock = threading.Lock()
+        self.max_chat_contexts = 128
         print(f"[✓] Loaded {len(self.api_keys)} Groq API key(s)")
     
-    def _get_client(self):
-    # Remove proxies parameter - newer Groq versions don't support it
-        return Groq(api_key=self.api_keys[self.current_key_index])
+    def _get_client(self, key_index):
+        """Pooled client for a key"""
+        return self.clients[key_index]
+    
+    def _cache_key(self, messages, temperature, max_tokens):
+        return self.response_cache.make_key(self.model, messages, temperature=temperature, max_tokens=max_tokens)
     
-    def _call_with_fallback(self, messages, temperature=0.3, max_tokens=2000):
-        """Call Groq API with automatic fallback"""
+    # Retries for 5xx / connection / timeout errors (the SDK's own retries are off)
+    TRANSIENT_RETRIES = 2
+    
+    def _is_transient(self, error):
+        return isinstance(error, (APIConnectionError, APITimeoutError, InternalServerError))
+    
+    def _transient_backoff(self, key_index, attempt, error):
+        metrics.count("llm_retries", key=key_index + 1)
+        delay = random.uniform(0.5, 1.0) * attempt
+        print(f"[!] Transient error on key {key_index + 1} ({error}), retrying in {delay:.1f}s...")
+        time.sleep(delay)
+    
+    def _request_with_fallback(self, send):
+        """
+        Run send(client, key_index) on the key with most headroom, switching keys on
+        rate limits and retrying transient errors. Returns (key_index, result) with
+        the key still acquired: the caller releases it once the response is consumed.
+        """
         attempts = 0
+        transient_attempts = 0
         max_attempts = len(self.api_keys) * 2
         
         while attempts < max_attempts:
+            key_index, wait = self.key_scheduler.acquire()
+            if wait > 0:
+                print(f"[*] All keys throttled, waiting {wait:.1f}s for key {key_index + 1}...")
+                time.sleep(wait)
+            
             try:
-                client = self._get_client()
-                response = client.chat.completions.create(
-                    model=self.model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-                
-                content = response.choices[0].message.content
-                
-                if content is None or not isinstance(content, str):
-                    raise ValueError("API returned invalid content")
-                
-                return content
+                return key_index, send(self._get_client(key_index), key_index)
                 
             except Exception as e:
                 error_msg = str(e)
+                headers = getattr(getattr(e, "response", None), "headers", None)
                 
                 if "rate_limit" in error_msg.lower() or "429" in error_msg:
-                    print(f"[!] Rate limit on key {self.current_key_index + 1}, switching...")
-                    self.current_key_index = (self.current_key_index + 1) % len(self.api_keys)
+                    metrics.count("llm_retries", key=key_index + 1)
+                    backoff = self.key_scheduler.release(key_index, headers, rate_limited=True)
+                    print(f"[!] Rate limit on key {key_index + 1}, parked for {backoff:.1f}s, switching...")
                     attempts += 1
-                    time.sleep(1)
                     continue
-                else:
-                    raise e
+                
+                self.key_scheduler.release(key_index, headers)
+                
+                if self._is_transient(e) and transient_attempts < self.TRANSIENT_RETRIES:
+                    transient_attempts += 1
+                    self._transient_backoff(key_index, transient_attempts, e)
+                    continue
+                raise e
         
         raise Exception("All API keys exhausted")
     
-    def correct_transcript(self, raw_transcript, language="hindi"):
+    def _call_with_fallback(self, messages, temperature=0.3, max_tokens=2000, use_cache=False):
+        """
+        Call Groq API on the key with most headroom, with automatic fallback.
+        With use_cache, identical (normalized) requests are answered from the response cache.
+        """
+        cache_key = None
+        if use_cache:
+            cache_key = self._cache_key(messages, temperature, max_tokens)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                metrics.count("llm_cache_hits")
+                print(f"[✓] LLM response cache hit")
+                return cached
+        
+        def send(client, key_index):
+            with metrics.span("llm_call", key=key_index + 1):
+                return client.chat.completions.with_raw_response.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+        
+        key_index, raw = self._request_with_fallback(send)
+        self.key_scheduler.release(key_index, raw.headers)
+        response = raw.parse()
+        
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            metrics.count("llm_prompt_tokens", usage.prompt_tokens or 0, key=key_index + 1)
+            metrics.count("llm_completion_tokens", usage.completion_tokens or 0, key=key_index + 1)
+        
+        content = response.choices[0].message.content
+        
+        if content is None or not isinstance(content, str):
+            raise ValueError("API returned invalid content")
+        
+        if cache_key:
+            self.response_cache.put(cache_key, self.model, content)
+        
+        return content
+    
+    def _stream_with_fallback(self, messages, temperature=0.3, max_tokens=2000):
+        """
+        Stream a Groq completion token by token. Rate limits surface before the
+        first token, so key fallback works the same as in _call_with_fallback.
+        The key counts as in flight until the stream is consumed or closed.
+        """
+        def send(client, key_index):
+            with metrics.span("llm_stream_start", key=key_index + 1):
+                return client.chat.completions.with_raw_response.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=True
+                )
+        
+        key_index, raw = self._request_with_fallback(send)
+        try:
+            for chunk in raw.parse():
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            self.key_scheduler.release(key_index, raw.headers)
+    
+    def correct_transcript(self, raw_transcript, language="hindi", use_cache=True):
         """Correct medical terms in transcript"""
         print(f"[*] Correcting transcript...")
         
@@ -89,9 +367,10 @@ Return corrected transcript as plain text."""
         ]
         
         try:
-            corrected = self._call_with_fallback(messages, temperature=0.2, max_tokens=1500)
+            corrected = self._call_with_fallback(messages, temperature=0.2, max_tokens=1500, use_cache=use_cache)
             
-            if not corrected or not isinstance(corrected, str):
+            if not corrected or not isinstance(corrected, str) or not corrected.strip():
+                self.response_cache.discard(self._cache_key(messages, 0.2, 1500))
                 raise ValueError("Invalid response")
             
             print(f"[✓] Transcript corrected")
@@ -101,16 +380,205 @@ Return corrected transcript as plain text."""
             print(f"[!] Correction failed: {e}")
             return raw_transcript
     
-    def analyze_claims(self, transcript, language="hindi"):
+    def _analysis_language(self, language):
+        """Language instruction and script note for analysis prompts"""
+        if language == "hindi":
+            return "हिंदी (देवनागरी लिपि में)", "CRITICAL: Use ONLY Devanagari (देवनागरी), NOT Urdu (اردو)."
+        return "English", ""
+    
+    def _validate_analysis(self, result):
+        """Strict shape check for analysis JSON; raises ValueError if malformed"""
+        if not isinstance(result, dict):
+            raise ValueError("Analysis is not a JSON object")
+        if not isinstance(result.get('summary'), str):
+            raise ValueError("Missing 'summary'")
+        if not isinstance(result.get('claims'), list):
+            raise ValueError("Missing 'claims' list")
+        if isinstance(result.get('rating'), bool) or not isinstance(result.get('rating'), (int, float)):
+            raise ValueError("Missing numeric 'rating'")
+        if not isinstance(result.get('key_issues', []), list):
+            raise ValueError("'key_issues' is not a list")
+        return result
+    
+    # Transcripts longer than this are split and analyzed segment by segment
+    SEGMENT_CHARS = 3000
+    
+    def _split_segments(self, text, max_chars):
+        """Split text at sentence boundaries (or word boundaries if unpunctuated) into <= max_chars pieces"""
+        sentences = [part for part in re.split(r'(?<=[.!?।|])\s+', text.strip()) if part]
+        
+        pieces = []
+        for sentence in sentences:
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(' ', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].strip()
+            if sentence:
+                pieces.append(sentence)
+        
+        segments = []
+        for piece in pieces:
+            if segments and len(segments[-1]) + 1 + len(piece) <= max_chars:
+                segments[-1] += " " + piece
+            else:
+                segments.append(piece)
+        return segments
+    
+    def _map_reduce_analyze(self, raw_transcript, language="hindi", use_cache=True):
+        """
+        Long transcripts: correct and analyze segments in parallel, then merge.
+        Claims are deduplicated; the rating is the claim-weighted mean of segment ratings.
+        Segments whose analysis failed keep their transcript but are left out of the
+        summary, claims and rating; if every segment failed, the analysis fails.
+        """
+        segments = self._split_segments(raw_transcript, self.SEGMENT_CHARS)
+        print(f"[*] Long transcript ({len(raw_transcript)} chars): analyzing {len(segments)} segments in parallel...")
+        
+        with ThreadPoolExecutor(max_workers=min(len(segments), 2 * len(self.api_keys))) as pool:
+            results = list(pool.map(lambda seg: self.correct_and_analyze(seg, language, use_cache), segments))
+        
+        failed = sum(1 for _, analysis in results if analysis.get('failed'))
+        if failed == len(results):
+            raise Exception(f"Analysis failed for all {failed} segments")
+        if failed:
+            print(f"[!] {failed}/{len(results)} segments failed, merging the rest")
+        
+        corrected_parts = []
+        claims = []
+        seen_claims = set()
+        key_issues = []
+        summaries = []
+        weighted_rating = 0.0
+        total_weight = 0
+        
+        for corrected, analysis in results:
+            corrected_parts.append(corrected)
+            if analysis.get('failed'):
+                continue
+            
+            if analysis.get('summary'):
+                summaries.append(analysis['summary'])
+            
+            for claim in analysis.get('claims', []):
+                key = " ".join(str(claim.get('claim', '')).lower().split())
+                if key and key not in seen_claims:
+                    seen_claims.add(key)
+                    claims.append(claim)
+            
+            for issue in analysis.get('key_issues', []):
+                if issue not in key_issues:
+                    key_issues.append(issue)
+            
+            weight = max(1, len(analysis.get('claims', [])))
+            try:
+                weighted_rating += float(analysis.get('rating', 0)) * weight
+                total_weight += weight
+            except (TypeError, ValueError):
+                pass
+        
+        analysis = {
+            "summary": " ".join(summaries),
+            "claims": claims,
+            "rating": round(weighted_rating / total_weight, 1) if total_weight else 50.0,
+            "key_issues": key_issues
+        }
+        
+        print(f"[✓] Merged {len(segments) - failed} segments: {len(claims)} claims (Rating: {analysis['rating']}%)")
+        return " ".join(corrected_parts), analysis
+    
+    def correct_and_analyze(self, raw_transcript, language="hindi", use_cache=True):
+        """
+        Correct the transcript and analyze its claims in a single LLM request.
+        Falls back to correct_transcript + analyze_claims if the combined
+        response can't be parsed strictly. Transcripts longer than
+        SEGMENT_CHARS are split and handled by _map_reduce_analyze.
+        
+        Returns:
+            tuple: (corrected_transcript, analysis)
+        """
+        if len(raw_transcript) > self.SEGMENT_CHARS:
+            return self._map_reduce_analyze(raw_transcript, language, use_cache)
+        
+        print(f"[*] Correcting and analyzing in one request...")
+        
+        lang_instruction, lang_note = self._analysis_language(language)
+        lang_name = "हिंदी (देवनागरी)" if language == "hindi" else "English"
+        
+        system_prompt = f"""You are a medical transcript editor and fact-checker.
+
+Step 1 - Correct the transcript:
+1. Fix medical terminology
+2. Correct grammar
+3. Keep original meaning
+4. Write it ONLY in {lang_name} script
+
+Step 2 - Fact-check the corrected transcript in {lang_instruction}.
+
+{lang_note}
+
+Return ONLY valid JSON:
+{{
+    "corrected_transcript": "Corrected transcript in {lang_name}",
+    "summary": "Overall analysis in {lang_instruction}",
+    "claims": [
+        {{
+            "claim": "Specific claim in {lang_instruction}",
+            "verdict": "TRUE/FALSE/PARTIALLY TRUE",
+            "explanation": "Why in {lang_instruction}",
+            "sources": ["PubMed PMID:12345", "WHO 2024"]
+        }}
+    ],
+    "rating": 75.5,
+    "key_issues": ["Issue in {lang_instruction}"]
+}}
+
+Cite sources (PubMed, WHO, CDC). Rate 0-100%."""
+
+        user_prompt = f"""Correct and analyze this medical transcript:
+
+{raw_transcript}"""
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        
+        try:
+            content = self._call_with_fallback(messages, temperature=0.2, max_tokens=4000, use_cache=use_cache)
+            
+            try:
+                if not content or not isinstance(content, str):
+                    raise ValueError("Invalid response")
+                
+                json_start = content.find('{')
+                json_end = content.rfind('}') + 1
+                if json_start == -1 or json_end <= json_start:
+                    raise ValueError("No JSON in response")
+                
+                result = self._validate_analysis(json.loads(content[json_start:json_end]))
+                corrected = result.pop('corrected_transcript', None)
+                
+                if not isinstance(corrected, str) or not corrected.strip():
+                    raise ValueError("Missing 'corrected_transcript'")
+            except Exception:
+                # Never keep an unparseable response in the cache
+                self.response_cache.discard(self._cache_key(messages, 0.2, 4000))
+                raise
+            
+            print(f"[✓] Corrected and analyzed (Rating: {result.get('rating', 0)}%)")
+            return corrected.strip(), result
+            
+        except Exception as e:
+            print(f"[!] Combined request failed ({e}), falling back to two calls")
+            corrected = self.correct_transcript(raw_transcript, language, use_cache=use_cache)
+            return corrected, self.analyze_claims(corrected, language, use_cache=use_cache)
+    
+    def analyze_claims(self, transcript, language="hindi", use_cache=True):
         """Analyze health claims"""
         print(f"[*] Analyzing health claims...")
         
-        if language == "hindi":
-            lang_instruction = "हिंदी (देवनागरी लिपि में)"
-            lang_note = "CRITICAL: Use ONLY Devanagari (देवनागरी), NOT Urdu (اردو)."
-        else:
-            lang_instruction = "English"
-            lang_note = ""
+        lang_instruction, lang_note = self._analysis_language(language)
         
         system_prompt = f"""You are a medical fact-checker. Analyze in {lang_instruction}.
 
@@ -143,21 +611,26 @@ Cite sources (PubMed, WHO, CDC). Rate 0-100%."""
         ]
         
         try:
-            content = self._call_with_fallback(messages, temperature=0.3, max_tokens=2500)
-            
-            if not content or not isinstance(content, str):
-                raise ValueError("Invalid response")
-            
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
+            content = self._call_with_fallback(messages, temperature=0.3, max_tokens=2500, use_cache=use_cache)
             
-            if json_start != -1 and json_end > json_start:
-                json_str = content[json_start:json_end]
-                result = json.loads(json_str)
-                print(f"[✓] Analysis complete (Rating: {result.get('rating', 0)}%)")
-                return result
-            else:
-                raise ValueError("No JSON in response")
+            try:
+                if not content or not isinstance(content, str):
+                    raise ValueError("Invalid response")
+                
+                json_start = content.find('{')
+                json_end = content.rfind('}') + 1
+                
+                if json_start != -1 and json_end > json_start:
+                    json_str = content[json_start:json_end]
+                    result = json.loads(json_str)
+                    print(f"[✓] Analysis complete (Rating: {result.get('rating', 0)}%)")
+                    return result
+                else:
+                    raise ValueError("No JSON in response")
+            except Exception:
+                # Never keep an unparseable response in the cache
+                self.response_cache.discard(self._cache_key(messages, 0.3, 2500))
+                raise
                 
         except Exception as e:
             print(f"[!] Analysis failed: {e}")
@@ -165,12 +638,18 @@ Cite sources (PubMed, WHO, CDC). Rate 0-100%."""
                 "summary": f"त्रुटि: {str(e)}" if language == "hindi" else f"Error: {str(e)}",
                 "claims": [],
                 "rating": 50.0,
-                "key_issues": ["पुनः प्रयास करें" if language == "hindi" else "Please retry"]
+                "key_issues": ["पुनः प्रयास करें" if language == "hindi" else "Please retry"],
+                "failed": True
             }
     
-    def chat_about_video(self, transcript, corrected_transcript, analysis, user_question, chat_history, language="hindi"):
-        """Chat with full context"""
-        
+    # Recent exchanges sent verbatim; older ones are folded into a summary
+    # of at most CHAT_SUMMARY_LINES lines (the oldest are dropped first)
+    CHAT_RECENT_TURNS = 3
+    CHAT_SUMMARY_CHARS = 160
+    CHAT_SUMMARY_LINES = 12
+    
+    def _chat_system_prompt(self, transcript, corrected_transcript, analysis, language):
+        """Compact video context: one transcript and minified analysis JSON"""
         if language == "hindi":
             lang_instruction = "हिंदी (देवनागरी)"
             lang_note = "RESPOND ONLY in Devanagari (देवनागरी)."
@@ -178,24 +657,91 @@ Cite sources (PubMed, WHO, CDC). Rate 0-100%."""
             lang_instruction = "English"
             lang_note = ""
         
-        system_prompt = f"""You are a medical expert. Respond in {lang_instruction}.
+        analysis_json = json.dumps(analysis, ensure_ascii=False, separators=(',', ':'))
+        
+        return f"""You are a medical expert. Respond in {lang_instruction}.
 
 {lang_note}
 
 === VIDEO INFO ===
-Original: {transcript}
-Corrected: {corrected_transcript}
-Analysis: {json.dumps(analysis, ensure_ascii=False, indent=2)}
+Transcript: {corrected_transcript or transcript}
+Analysis: {analysis_json}
 
 Answer questions about this video in {lang_instruction}."""
-
+    
+    def _summarize_turn(self, chat):
+        """One-line extractive summary of an older exchange"""
+        question = " ".join(chat['user_message'].split())
+        answer = " ".join(chat['assistant_response'].split())
+        if len(answer) > self.CHAT_SUMMARY_CHARS:
+            answer = answer[:self.CHAT_SUMMARY_CHARS].rsplit(' ', 1)[0] + "..."
+        return f"- Q: {question[:self.CHAT_SUMMARY_CHARS]} | A: {answer}"
+    
+    def _build_chat_messages(self, transcript, corrected_transcript, analysis, user_question, chat_history, language="hindi",
+                             fact_check_id=None, context_version=None):
+        """
+        System prompt with video context, a summary of older exchanges,
+        the most recent exchanges and the new question.
+        
+        With a fact_check_id the system prompt and summary are cached and the
+        summary is extended incrementally as the conversation grows.
+        context_version (e.g. the fact check's created_at) must change when the
+        reel is re-analyzed (Force Refresh), so the prompt is rebuilt.
+        """
+        older = chat_history[:-self.CHAT_RECENT_TURNS] if len(chat_history) > self.CHAT_RECENT_TURNS else []
+        recent = chat_history[len(older):]
+        
+        context = None
+        if fact_check_id is not None:
+            cache_key = (fact_check_id, context_version, language)
+            with self._chat_contexts_lock:
+                context = self._chat_contexts.get(cache_key)
+                if context is not None:
+                    self._chat_contexts.move_to_end(cache_key)
+        
+        # History shrank (e.g. a different conversation): rebuild the summary
+        if context is None or context["summarized"] > len(older):
+            context = {
+                "system_prompt": self._chat_system_prompt(transcript, corrected_transcript, analysis, language),
+                "summary_lines": [],
+                "summarized": 0
+            }
+        
+        # Copy before extending: other sessions may share the cached context
+        context = {
+            "system_prompt": context["system_prompt"],
+            "summary_lines": (context["summary_lines"] + [
+                self._summarize_turn(chat) for chat in older[context["summarized"]:]
+            ])[-self.CHAT_SUMMARY_LINES:],
+            "summarized": len(older)
+        }
+        
+        if fact_check_id is not None:
+            with self._chat_contexts_lock:
+                self._chat_contexts[cache_key] = context
+                while len(self._chat_contexts) > self.max_chat_contexts:
+                    self._chat_contexts.popitem(last=False)
+        
+        system_prompt = context["system_prompt"]
+        if context["summary_lines"]:
+            system_prompt += "\n\n=== EARLIER CONVERSATION ===\n" + "\n".join(context["summary_lines"])
+        
         messages = [{"role": "system", "content": system_prompt}]
         
-        for chat in chat_history[-5:]:
+        for chat in recent:
             messages.append({"role": "user", "content": chat['user_message']})
             messages.append({"role": "assistant", "content": chat['assistant_response']})
         
         messages.append({"role": "user", "content": user_question})
+        return messages
+    
+    def chat_about_video(self, transcript, corrected_transcript, analysis, user_question, chat_history, language="hindi",
+                         fact_check_id=None, context_version=None):
+        """Chat with compact video context (cached per fact_check_id when given)"""
+        messages = self._build_chat_messages(
+            transcript, corrected_transcript, analysis, user_question, chat_history, language,
+            fact_check_id, context_version
+        )
         
         try:
             response = self._call_with_fallback(messages, temperature=0.7, max_tokens=1000)
@@ -208,4 +754,22 @@ Answer questions about this video in {lang_instruction}."""
         except Exception as e:
             error_msg = f"त्रुटि: {str(e)}" if language == "hindi" else f"Error: {str(e)}"
             print(f"[!] Chat failed: {e}")
-            return error_msg
\ No newline at end of file
+            return error_msg
+    
+    def chat_about_video_stream(self, transcript, corrected_transcript, analysis, user_question, chat_history, language="hindi",
+                                fact_check_id=None, context_version=None):
+        """
+        Streaming variant of chat_about_video: yields response tokens as they arrive.
+        Errors are yielded as a final message so the caller can still save the turn.
+        """
+        messages = self._build_chat_messages(
+            transcript, corrected_transcript, analysis, user_question, chat_history, language,
+            fact_check_id, context_version
+        )
+        
+        try:
+            yield from self._stream_with_fallback(messages, temperature=0.7, max_tokens=1000)
+            
+        except Exception as e:
+            print(f"[!] Chat failed: {e}")
+            yield f"त्रुटि: {str(e)}" if language == "hindi" else f"Error: {str(e)}"
@@ -0,0 +1,194 @@
+"""
+Lightweight per-stage latency and usage metrics.
+
+Disabled by default; set INSTA_CHECK_METRICS=1 to enable. When disabled,
+span() returns a shared no-op context manager and count() returns
+immediately, so instrumentation costs almost nothing.
+
+Optional (only when enabled):
+    INSTA_CHECK_METRICS_LOG=path   append one JSON line per span / counter
+    INSTA_CHECK_METRICS_PORT=9108  serve Prometheus text format on /metrics
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+ENABLED = os.getenv("INSTA_CHECK_METRICS", "").lower() in ("1", "true", "yes")
+LOG_FILE = os.getenv("INSTA_CHECK_METRICS_LOG")
+
+# Histogram buckets in seconds (RapidAPI/LLM calls can take tens of seconds)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_histograms = {}   # (name, labels) -> {"buckets": [...], "sum": float, "count": int}
+_counters = {}     # (name, labels) -> float
+_server = None
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopSpan()
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _log(record):
+    if not LOG_FILE:
+        return
+    with _lock:
+        with open(LOG_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def observe(name, seconds, **labels):
+    """Record one duration sample for a stage"""
+    if not ENABLED:
+        return
+    
+    key = (name, _labels_key(labels))
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += seconds
+        hist["count"] += 1
+    
+    _log({"ts": time.time(), "type": "span", "name": name, "seconds": round(seconds, 6), **labels})
+
+def count(name, value=1, **labels):
+    """Increment a counter (e.g. tokens used, retries)"""
+    if not ENABLED:
+        return
+    
+    key = (name, _labels_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    
+    _log({"ts": time.time(), "type": "counter", "name": name, "value": value, **labels})
+
+@contextmanager
+def _timed_span(name, labels):
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        if error:
+            labels = dict(labels, error=error)
+        observe(name, time.perf_counter() - start, **labels)
+
+def span(name, **labels):
+    """Time a block: `with metrics.span("rapidapi_lookup"): ...`"""
+    if not ENABLED:
+        return _NOOP
+    return _timed_span(name, labels)
+
+def timed(name, **labels):
+    """Decorator form of span()"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return func(*args, **kwargs)
+            with _timed_span(name, labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+def export_prometheus():
+    """All metrics in Prometheus text exposition format"""
+    lines = []
+    with _lock:
+        histograms = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]} for k, v in _histograms.items()}
+        counters = dict(_counters)
+    
+    for name in sorted({k[0] for k in histograms}):
+        metric = f"insta_check_{name}_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for (hist_name, labels), hist in sorted(histograms.items()):
+            if hist_name != name:
+                continue
+            for bound, value in zip(BUCKETS, hist["buckets"]):
+                lines.append(f"{metric}_bucket{_format_labels(labels, [('le', bound)])} {value}")
+            lines.append(f"{metric}_bucket{_format_labels(labels, [('le', '+Inf')])} {hist['count']}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {hist['sum']:.6f}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {hist['count']}")
+    
+    for name in sorted({k[0] for k in counters}):
+        metric = f"insta_check_{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for (counter_name, labels), value in sorted(counters.items()):
+            if counter_name == name:
+                lines.append(f"{metric}{_format_labels(labels)} {value}")
+    
+    return "\n".join(lines) + "\n"
+
+def export_json():
+    """All metrics as a JSON-serializable dict"""
+    with _lock:
+        return {
+            "histograms": [
+                {"name": name, "labels": dict(labels), "sum": h["sum"], "count": h["count"],
+                 "buckets": dict(zip(map(str, BUCKETS), h["buckets"]))}
+                for (name, labels), h in _histograms.items()
+            ],
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in _counters.items()
+            ]
+        }
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, content_type = json.dumps(export_json()), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, content_type = export_prometheus(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, *args):
+        pass
+
+def start_http_server(port=None):
+    """Serve /metrics (Prometheus) and /metrics.json on localhost in a daemon thread (once per process)"""
+    global _server
+    port = port or os.getenv("INSTA_CHECK_METRICS_PORT")
+    if not ENABLED or not port or _server is not None:
+        return
+    
+    try:
+        _server = HTTPServer(("127.0.0.1", int(port)), _MetricsHandler)
+    except OSError as e:
+        print(f"[!] Metrics endpoint not started: {e}")
+        return
+    
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    print(f"[✓] Metrics endpoint: http://127.0.0.1:{port}/metrics")
@@ -0,0 +1,80 @@
+"""
+Writing-script analysis for transcripts (Devanagari vs Arabic/Urdu vs Latin).
+
+analyze() classifies a string in one pass with a precomputed translate
+table (the per-character work runs in C) and caches the result per
+transcript, so the agent's log and the UI's debug box share one scan.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+SCRIPTS = ("devanagari", "arabic", "latin")
+
+# Unicode blocks per script (inclusive)
+_RANGES = {
+    "devanagari": [(0x0900, 0x097F), (0xA8E0, 0xA8FF)],
+    "arabic": [(0x0600, 0x06FF), (0x0750, 0x077F), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)],
+    "latin": [(0x41, 0x5A), (0x61, 0x7A)]
+}
+
+# Each script's letters become one marker character; the markers themselves
+# are deleted from the input so they can't be miscounted
+_MARKERS = {script: chr(1 + i) for i, script in enumerate(SCRIPTS)}
+_TABLE = {ord(marker): None for marker in _MARKERS.values()}
+for _script, _ranges in _RANGES.items():
+    for _start, _end in _ranges:
+        _TABLE.update(dict.fromkeys(range(_start, _end + 1), _MARKERS[_script]))
+
+# A second script counts as "mixed" once it reaches this share of the letters
+MIXED_THRESHOLD = 0.15
+
+# Scripts a recognizer may legitimately return per language
+# (Hindi transcripts often carry English words in Latin script)
+ACCEPTED_SCRIPTS = {
+    "hi": {"devanagari", "latin"},
+    "en": {"latin"}
+}
+
+class ScriptStats(namedtuple("ScriptStats", "devanagari arabic latin")):
+    """Letter counts per script, with derived ratios / dominant script / mixed flag"""
+    __slots__ = ()
+    
+    @property
+    def letters(self):
+        return self.devanagari + self.arabic + self.latin
+    
+    @property
+    def ratios(self):
+        total = self.letters
+        return {script: (getattr(self, script) / total if total else 0.0) for script in SCRIPTS}
+    
+    @property
+    def dominant(self):
+        """Script with the most letters, or None for text without any"""
+        if not self.letters:
+            return None
+        return max(SCRIPTS, key=lambda script: getattr(self, script))
+    
+    @property
+    def mixed(self):
+        return sum(1 for ratio in self.ratios.values() if ratio >= MIXED_THRESHOLD) > 1
+
+def count_scripts(text):
+    """Count Devanagari, Arabic/Urdu and Latin letters in text (uncached, for short strings)"""
+    marked = (text or "").translate(_TABLE)
+    return ScriptStats(*(marked.count(_MARKERS[script]) for script in SCRIPTS))
+
+@lru_cache(maxsize=256)
+def analyze(text):
+    """count_scripts() for whole transcripts, cached per string"""
+    return count_scripts(text)
+
+def is_expected_script(text, lang_code):
+    """
+    False if text is mostly in a script the language shouldn't produce
+    (e.g. Urdu script for "hi-IN"). Text without letters and unknown languages pass.
+    Uncached: meant for per-chunk checks, which would crowd transcripts out of analyze()'s cache.
+    """
+    accepted = ACCEPTED_SCRIPTS.get(lang_code.split("-")[0].lower())
+    dominant = count_scripts(text).dominant
+    return accepted is None or dominant is None or dominant in accepted
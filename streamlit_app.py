@@ -2,6 +2,9 @@ import streamlit as st
 from agent import ReelAgent
 from llm_checker import HealthClaimChecker
 from database import Database
+from jobs import JobManager
+import metrics
+import script_analysis
 import time
 
 st.set_page_config(
@@ -58,11 +61,13 @@ def init_components():
         print("\n" + "="*60)
         print("INITIALIZING COMPONENTS")
         print("="*60)
-        agent = ReelAgent()
-        checker = HealthClaimChecker()
         db = Database()
+        agent = ReelAgent(transcript_cache=db)
+        checker = HealthClaimChecker()
+        jobs = JobManager(agent, checker, db)
+        metrics.start_http_server()
         print("="*60 + "\n")
-        return agent, checker, db
+        return agent, checker, db, jobs
     except Exception as e:
         st.error(f"❌ Initialization Error: {e}")
         
@@ -105,11 +110,13 @@ def init_components():
         
         st.stop()
 
-agent, checker, db = init_components()
+agent, checker, db, jobs = init_components()
 
 # Session state
 if 'fact_check_id' not in st.session_state:
     st.session_state.fact_check_id = None
+if 'fact_check_created_at' not in st.session_state:
+    st.session_state.fact_check_created_at = None
 if 'analysis' not in st.session_state:
     st.session_state.analysis = None
 if 'transcript' not in st.session_state:
@@ -118,6 +125,8 @@ if 'corrected_transcript' not in st.session_state:
     st.session_state.corrected_transcript = None
 if 'current_url' not in st.session_state:
     st.session_state.current_url = ""
+if 'job_id' not in st.session_state:
+    st.session_state.job_id = None
 
 # Header
 st.markdown('''
@@ -204,26 +213,26 @@ with col2:
 with col3:
     if st.session_state.analysis:
         if st.button("🆕 New Analysis", use_container_width=True):
-            for key in ['fact_check_id', 'analysis', 'transcript', 'corrected_transcript', 'current_url']:
+            for key in ['fact_check_id', 'fact_check_created_at', 'analysis', 'transcript', 'corrected_transcript', 'current_url']:
                 st.session_state[key] = None if key != 'current_url' else ""
             st.rerun()
 
-# Force refresh logic
+# Force refresh logic: drop the cached entry and re-run the full pipeline
 if force_refresh and reel_url:
     try:
         shortcode = agent._extract_shortcode(reel_url)
         db.clear_cache(shortcode)
         
-        for key in ['fact_check_id', 'analysis', 'transcript', 'corrected_transcript']:
+        for key in ['fact_check_id', 'fact_check_created_at', 'analysis', 'transcript', 'corrected_transcript']:
             st.session_state[key] = None
         
-        st.success(f"✅ Cache cleared for {shortcode}. Click 'Analyze' to re-process.")
+        st.success(f"✅ Cache cleared for {shortcode}. Re-processing...")
         
     except Exception as e:
         st.error(f"Error: {e}")
 
 # Analysis Process
-if analyze_button:
+if analyze_button or force_refresh:
     if not reel_url:
         st.error("⚠️ कृपया Instagram Reel URL दर्ज करें / Please enter URL")
     else:
@@ -234,84 +243,28 @@ if analyze_button:
             progress_bar = st.progress(0)
             status_box = st.empty()
             
-            # Step 1: Download & Transcribe
-            status_box.info("📥 Downloading reel via RapidAPI...")
-            progress_bar.progress(15)
-            
-            shortcode, raw_transcript = agent.download_and_extract(
-                reel_url,
-                video_lang=video_language.lower()
-            )
-            
-            # Debug info
-            if raw_transcript:
-                st.markdown('<div class="debug-box">', unsafe_allow_html=True)
-                
-                # Script detection
-                devanagari_count = sum(1 for c in raw_transcript if '\u0900' <= c <= '\u097F')
-                arabic_count = sum(1 for c in raw_transcript if '\u0600' <= c <= '\u06FF')
-                english_count = sum(1 for c in raw_transcript if c.isalpha() and c.isascii())
-                
-                st.markdown(f"""
-                **🔍 Debug Information:**
-                - Shortcode: `{shortcode}`
-                - Transcript length: `{len(raw_transcript)}` characters
-                - Devanagari chars: {devanagari_count}
-                - Arabic/Urdu chars: {arabic_count}
-                - English chars: {english_count}
-                - Script: {'✅ Devanagari' if devanagari_count > arabic_count else '⚠️ Not Devanagari'}
-                """)
-                st.markdown('</div>', unsafe_allow_html=True)
-            
-            progress_text.text("✅ Transcript extracted")
-            progress_bar.progress(35)
-            
-            # Check cache
-            existing = db.get_fact_check(shortcode)
+            # Step 0: Cache lookup before any download (skipped on Force Refresh)
+            shortcode = agent._extract_shortcode(reel_url)
+            existing = None if force_refresh else db.get_fact_check(shortcode)
             
             if existing:
                 st.warning(f"📂 Found cached analysis. Click 'Force Refresh' for new analysis.")
                 progress_bar.progress(100)
                 
                 st.session_state.transcript = existing['transcript']
-                st.session_state.corrected_transcript = existing.get('corrected_transcript', raw_transcript)
+                st.session_state.corrected_transcript = existing.get('corrected_transcript', existing['transcript'])
                 st.session_state.analysis = existing['analysis']
                 st.session_state.fact_check_id = existing['id']
+                st.session_state.fact_check_created_at = existing['created_at']
             else:
-                # Fresh analysis
-                status_box.info("✍️ Correcting medical terminology...")
-                progress_bar.progress(50)
-                
-                corrected_transcript = checker.correct_transcript(
-                    raw_transcript,
-                    output_language.lower()
-                )
-                
-                progress_text.text("✅ Transcript corrected")
-                progress_bar.progress(65)
-                
-                status_box.info("🔬 Analyzing health claims with AI...")
-                progress_bar.progress(75)
-                
-                analysis = checker.analyze_claims(
-                    corrected_transcript,
-                    output_language.lower()
-                )
-                
-                progress_text.text("✅ Analysis complete")
-                progress_bar.progress(90)
-                
-                # Save
-                fact_check_id = db.save_fact_check(
-                    reel_url, shortcode, raw_transcript,
-                    analysis,
-                    analysis.get('rating', 0)
+                # Run the pipeline in the background; this session polls below
+                st.session_state.job_id = jobs.submit(
+                    reel_url,
+                    video_lang=video_language.lower(),
+                    output_lang=output_language.lower(),
+                    refresh=force_refresh
                 )
-                
-                st.session_state.transcript = raw_transcript
-                st.session_state.corrected_transcript = corrected_transcript
-                st.session_state.analysis = analysis
-                st.session_state.fact_check_id = fact_check_id
+                st.rerun()
             
             status_box.success("✅ विश्लेषण पूर्ण! / Analysis complete!")
             progress_bar.progress(100)
@@ -332,6 +285,86 @@ if analyze_button:
             else:
                 st.info("💡 Tip: Check URL is correct and reel is public")
 
+# Background job progress (survives reruns; other sessions may share the job)
+if st.session_state.job_id:
+    job = jobs.get(st.session_state.job_id)
+    
+    try:
+        if job is None:
+            st.session_state.job_id = None
+            raise Exception("Analysis job was lost. Please retry.")
+        
+        stage_labels = {
+            'queued': "⏳ Waiting for a free worker...",
+            'download': "📥 Downloading reel via RapidAPI...",
+            'transcribe': "🎤 Transcribing...",
+            'analyze': "🔬 Correcting transcript and analyzing health claims with AI...",
+            'save': "💾 Saving analysis...",
+            'done': "✅ विश्लेषण पूर्ण! / Analysis complete!"
+        }
+        
+        if job['status'] == 'error':
+            st.session_state.job_id = None
+            raise Exception(job['error'])
+        
+        if job['status'] == 'done':
+            st.session_state.job_id = None
+            existing = db.get_fact_check(job['shortcode'])
+            if existing is None:
+                # Another session's Force Refresh deleted the row after this job saved it
+                raise Exception("The saved analysis was cleared by a Force Refresh. Please analyze the reel again.")
+            raw_transcript = existing['transcript']
+            
+            # Debug info
+            if raw_transcript:
+                st.markdown('<div class="debug-box">', unsafe_allow_html=True)
+                
+                # Script detection (cached per transcript, shared with the agent's log)
+                scripts = script_analysis.analyze(raw_transcript)
+                ratios = scripts.ratios
+                
+                st.markdown(f"""
+                **🔍 Debug Information:**
+                - Shortcode: `{job['shortcode']}`
+                - Transcript length: `{len(raw_transcript)}` characters
+                - Devanagari chars: {scripts.devanagari} ({ratios['devanagari']:.0%})
+                - Arabic/Urdu chars: {scripts.arabic} ({ratios['arabic']:.0%})
+                - English chars: {scripts.latin} ({ratios['latin']:.0%})
+                - Script: {'✅ Devanagari' if scripts.devanagari > scripts.arabic else '⚠️ Not Devanagari'}{' (mixed)' if scripts.mixed else ''}
+                """)
+                st.markdown('</div>', unsafe_allow_html=True)
+            
+            st.session_state.transcript = raw_transcript
+            st.session_state.corrected_transcript = existing.get('corrected_transcript', raw_transcript)
+            st.session_state.analysis = existing['analysis']
+            st.session_state.fact_check_id = existing['id']
+            st.session_state.fact_check_created_at = existing['created_at']
+            
+            st.success(stage_labels['done'])
+            time.sleep(1)
+            st.rerun()
+        
+        st.info(stage_labels.get(job['stage'], "⏳ Working..."))
+        st.progress(job['progress'])
+        if job.get('partial_transcript'):
+            st.caption(job['partial_transcript'][-300:])
+        
+        time.sleep(1)
+        st.rerun()
+        
+    except Exception as e:
+        st.error(f"❌ Error: {str(e)}")
+        
+        # Specific error handling
+        if "RAPIDAPI_KEY" in str(e):
+            st.warning("🔑 RapidAPI key missing. Add in Streamlit Secrets.")
+        elif "rate_limit" in str(e).lower():
+            st.warning("⚠️ API rate limit reached. Wait a few minutes.")
+        elif "No speech detected" in str(e):
+            st.warning("🔇 No clear audio found. Check:\n- Video has speech\n- Audio is clear\n- Correct language selected")
+        else:
+            st.info("💡 Tip: Check URL is correct and reel is public")
+
 # Results Display
 if st.session_state.analysis:
     st.markdown("---")
@@ -416,7 +449,7 @@ if st.session_state.analysis:
     col1, col2 = st.columns(2)
     
     with col1:
-        with st.expander("मूल ट्रांसक्रिप्ट / Original (Google Speech)", expanded=False):
+        with st.expander(f"मूल ट्रांसक्रिप्ट / Original ({agent.speech_backend.label})", expanded=False):
             st.text_area("", st.session_state.transcript, height=200, disabled=True, key="orig", label_visibility="collapsed")
     
     with col2:
@@ -427,7 +460,14 @@ if st.session_state.analysis:
     st.markdown("---")
     st.markdown('<div class="section-header"><h3>💬 प्रश्न पूछें / Ask Questions</h3></div>', unsafe_allow_html=True)
     
-    chat_history = db.get_chat_history(st.session_state.fact_check_id)
+    # Keep the conversation in session state and only read turns appended since the last rerun
+    if st.session_state.get('chat_fact_check_id') != st.session_state.fact_check_id:
+        st.session_state.chat_fact_check_id = st.session_state.fact_check_id
+        st.session_state.chat_history = []
+    
+    last_chat_id = st.session_state.chat_history[-1]['id'] if st.session_state.chat_history else 0
+    st.session_state.chat_history += db.get_chat_history(st.session_state.fact_check_id, since_id=last_chat_id)
+    chat_history = st.session_state.chat_history
     
     # Display chat history
     for chat in chat_history:
@@ -442,18 +482,19 @@ if st.session_state.analysis:
             st.write(prompt)
         
         with st.chat_message("assistant"):
-            with st.spinner("सोच रहा हूँ... / Thinking..."):
-                response = checker.chat_about_video(
-                    st.session_state.transcript,
-                    st.session_state.corrected_transcript or st.session_state.transcript,
-                    st.session_state.analysis,
-                    prompt,
-                    chat_history,
-                    output_language.lower()
-                )
-                st.write(response)
-                
-                db.save_chat(st.session_state.fact_check_id, prompt, response)
+            # Tokens are rendered as they arrive; write_stream returns the full text
+            response = st.write_stream(checker.chat_about_video_stream(
+                st.session_state.transcript,
+                st.session_state.corrected_transcript or st.session_state.transcript,
+                st.session_state.analysis,
+                prompt,
+                chat_history,
+                output_language.lower(),
+                fact_check_id=st.session_state.fact_check_id,
+                context_version=st.session_state.fact_check_created_at
+            ))
+            
+            db.save_chat(st.session_state.fact_check_id, prompt, response)
 
 # Footer
 st.markdown("---")